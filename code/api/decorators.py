@@ -2,6 +2,7 @@ from django.http import HttpResponse
 from django.http.response import Http404, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotFound, HttpResponseServerError
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
+from django.views.decorators.http import condition
 from .models import Node
 from socialDistribution.models import LocalAuthor
 from .node_manager import node_manager
@@ -73,4 +74,28 @@ def validate_node(view_func):
 
         return view_func(request, *args, **kwargs)
 
-    return wrapper_func
\ No newline at end of file
+    return wrapper_func
+
+def conditional_get(validators_func):
+    """
+        Add ETag / Last-Modified headers to the response and answer conditional GET requests
+        (If-None-Match, If-Modified-Since) with 304 Not Modified without calling the view.
+
+        validators_func(request, *args, **kwargs) must return a tuple (etag, last_modified), either
+        of which can be None. It is called at most once per request.
+    """
+
+    # Django Software Foundation, "Conditional View Processing", 2021-12-06
+    # https://docs.djangoproject.com/en/3.2/topics/conditional-view-processing/
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_validators'):
+            request._validators = validators_func(request, *args, **kwargs)
+        return request._validators
+
+    def etag_func(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
@@ -2,30 +2,102 @@
     Manage Node Configurations of remtote groups here.
 '''
 
-from .models import Node
+from django.core.cache import cache
+
 import logging
+import threading
+import time
+import uuid
+
+from .models import Node
 
 logger = logging.getLogger("api")
 
 class NodeManager:
+    '''
+        Keeps the credentials of all nodes in memory, so that authenticating incoming requests and
+        adding auth headers to outgoing requests does not need a database query.
+
+        The in-memory copy is reloaded when a Node is saved or deleted (see api/signals.py). Other
+        processes (e.g. other gunicorn workers) notice the change through a version token stored in
+        the shared Django cache. The copy is also reloaded after CACHE_TTL seconds, which bounds how
+        long a process can use outdated credentials if the shared cache is not shared after all.
+    '''
+
+    CACHE_TTL = 300
+    VERSION_KEY = 'node-credentials-version'
+
+    def __init__(self):
+        self._by_host = None
+        self._by_username = None
+        self._version = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        '''
+            Drop the in-memory credentials of this process and tell other processes to drop theirs.
+        '''
+        with self._lock:
+            self._by_host = None
+            self._by_username = None
+
+        try:
+            cache.set(self.VERSION_KEY, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.error(e, exc_info=True)
+
+    def _get_version(self):
+        try:
+            return cache.get(self.VERSION_KEY)
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            return None
+
+    def _load(self):
+        '''
+            Load the credentials of all nodes with a single query.
+        '''
+        logger.info("Loading basic auth credentials of all nodes")
+
+        by_host = {}
+        by_username = {}
+        for node in Node.objects.all():
+            for mapping, key in [(by_host, (node.host, node.remote_credentials)), (by_username, (node.username, node.remote_credentials))]:
+                # like Node.objects.get, don't pick one of several matching nodes
+                mapping[key] = b'' if key in mapping else node.get_credentials()
+
+        self._by_host = by_host
+        self._by_username = by_username
+        self._loaded_at = time.monotonic()
+
+    def _get_mappings(self):
+        version = self._get_version()
+
+        with self._lock:
+            is_expired = time.monotonic() - self._loaded_at > self.CACHE_TTL
+            if self._by_host is None or version != self._version or is_expired:
+                self._load()
+                self._version = version
+
+            return self._by_host, self._by_username
 
     def get_credentials(self, host=None, username=None, remote_credentials=False):
         '''
-            Retrieve basic auth credentials from database.
+            Retrieve basic auth credentials of a node.
         '''
 
         try:
+            by_host, by_username = self._get_mappings()
+
             if(host):
-                logger.info(f"Getting basic auth credentials for host: {host} and remote_credentials: {remote_credentials}")
-                node = Node.objects.get(host=host, remote_credentials=remote_credentials)
+                return by_host.get((host, remote_credentials), b'')
             elif (username):
-                logger.info(f"Getting basic auth credentials for username: {username} and remote_credentials: {remote_credentials}")
-                node = Node.objects.get(username=username, remote_credentials=remote_credentials)
+                return by_username.get((username, remote_credentials), b'')
             else:
                 logger.warn("Incoming request with no authentication header")
                 raise AttributeError('Host or  username must be sent!')
 
-            return str.encode(f'{node.username}:{node.password}')
         except Exception as e:
             logger.error(e, exc_info=True)
             return b''
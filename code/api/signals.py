@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Node
+from .node_manager import node_manager
+
+
+# Django Software Foundation, "Signals", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/topics/signals/
+@receiver(post_save, sender=Node)
+@receiver(post_delete, sender=Node)
+def invalidate_node_credentials(sender, **kwargs):
+    """ Reload the credentials cached by the node manager when a node changes. Only runs once the
+        change is committed, otherwise another process could reload the old credentials first.
+    """
+    transaction.on_commit(node_manager.invalidate)
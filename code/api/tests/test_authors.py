@@ -241,6 +241,35 @@ class AuthorsViewTests(TestCase):
         items = data.get("items")
         self.assertListEqual(items, expected)
 
+    def test_get_authors_cursor_paginated(self):
+        for i in range(5):
+            create_author(f"user{i}", f"User {i}", None, None)
+
+        usernames = []
+        url = reverse("api:authors") + '?size=2&cursor='
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            usernames.extend(item["displayName"] for item in body["items"])
+            url = body["next"]
+
+        self.assertEqual(usernames, [f"User {i}" for i in range(5)])
+
+    def test_get_authors_size_only(self):
+        for i in range(3):
+            create_author(f"user{i}", f"User {i}", None, None)
+
+        # without a cursor, size alone does not paginate
+        response = self.client.get(reverse("api:authors") + '?size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 3)
+        self.assertNotIn("next", response.json())
+
+    def test_get_authors_bad_cursor(self):
+        response = self.client.get(reverse("api:authors") + '?size=2&cursor=abc')
+        self.assertEqual(response.status_code, 400)
+
     def test_get_author(self):
         author = create_author(
             "user1",
@@ -265,6 +294,24 @@ class AuthorsViewTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertDictEqual(actual, expected)
 
+    def test_get_author_not_modified(self):
+        author = create_author(
+            "user1",
+            "John Doe",
+            "https://github.com/johndoe",
+            "https://i.imgur.com/k7XVwpB.jpeg"
+        )
+        url = reverse("api:author", kwargs={"author_id": author.id})
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
     def test_post_author(self):
         author = create_author_with_auth()
 
@@ -212,6 +212,9 @@ class InboxViewTests(TestCase):
         )
 
         self.assertEqual(response.status_code, 200)
+
+        # the like counter is stored on the comment row
+        comment.refresh_from_db()
         self.assertEqual(comment.total_likes(), 1)
         liker = comment.likes.all()[0]
         self.assertEqual(liker.author.id, author1.id)
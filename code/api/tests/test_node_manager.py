@@ -0,0 +1,68 @@
+# python manage.py test api.tests.test_node_manager
+
+from django.test import TestCase
+
+import logging
+
+from api.models import Node
+from api.node_manager import node_manager
+
+
+class NodeManagerTests(TestCase):
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        # Django Software Foundation, "Testing on_commit() callbacks", 2021-12-06
+        # https://docs.djangoproject.com/en/3.2/topics/testing/tools/#django.test.TestCase.captureOnCommitCallbacks
+        with self.captureOnCommitCallbacks(execute=True):
+            self.node = Node.objects.create(host="node.example.com", username="team99", password="secret99", remote_credentials=True)
+
+    def test_get_credentials_without_query(self):
+        self.assertEqual(b'team99:secret99', node_manager.get_credentials(host="node.example.com", remote_credentials=True))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(b'team99:secret99', node_manager.get_credentials(host="node.example.com", remote_credentials=True))
+            self.assertEqual(b'team99:secret99', node_manager.get_credentials(username="team99", remote_credentials=True))
+            self.assertEqual(b'', node_manager.get_credentials(host="unknown.example.com", remote_credentials=True))
+
+    def test_remote_credentials_flag(self):
+        self.assertEqual(b'', node_manager.get_credentials(host="node.example.com", remote_credentials=False))
+
+    def test_invalidated_on_save(self):
+        node_manager.get_credentials(host="node.example.com", remote_credentials=True)
+
+        self.node.password = "newsecret"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.node.save()
+        self.assertEqual(b'team99:newsecret', node_manager.get_credentials(host="node.example.com", remote_credentials=True))
+
+    def test_invalidated_on_delete(self):
+        node_manager.get_credentials(host="node.example.com", remote_credentials=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.node.delete()
+        self.assertEqual(b'', node_manager.get_credentials(host="node.example.com", remote_credentials=True))
+
+    def test_invalidated_on_commit(self):
+        node_manager.get_credentials(host="node.example.com", remote_credentials=True)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.node.password = "newsecret"
+            self.node.save()
+
+            # not committed yet
+            self.assertEqual(b'team99:secret99', node_manager.get_credentials(host="node.example.com", remote_credentials=True))
+
+        self.assertEqual(1, len(callbacks))
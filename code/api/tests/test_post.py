@@ -9,7 +9,9 @@ import json
 import logging
 import uuid
 
-from socialDistribution.models import LocalPost, LocalAuthor
+from datetime import datetime, timezone
+
+from socialDistribution.models import LocalPost, LocalAuthor, Comment
 from cmput404.constants import API_BASE
 from .utilities import create_author, get_basic_auth
 
@@ -85,6 +87,35 @@ class PostViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(response.content, expected)
 
+    def test_get_post_not_modified(self):
+        author = mixer.blend(LocalAuthor)
+        post = create_post("first", author)
+        url = reverse('api:post', args=(post.author.id, post.id))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        # the post includes comments, and deleting a comment does not make any timestamp newer
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # ETag changes when a comment is added
+        comment = Comment.objects.create(author=author, post=post, comment="hi", pub_date=datetime.now(timezone.utc))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # and when it is deleted again
+        etag = response['ETag']
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_post_post(self):
         self.maxDiff = None
         author = create_author()
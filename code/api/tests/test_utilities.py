@@ -1,12 +1,14 @@
 # python manage.py test api.tests.test_utilities
 
 from django.test import TestCase
+from mixer.backend.django import mixer
 
 import datetime
 from datetime import timezone
 import logging
 
-from api.utility import makeInboxPost
+from api.utility import makeInboxPost, getCursorPaginated
+from socialDistribution.models import Author, LocalAuthor, LocalPost
 
 
 class UtilityTests(TestCase):
@@ -54,3 +56,93 @@ class UtilityTests(TestCase):
         post = makeInboxPost(post_json)
 
         self.assertEqual(post.published, expected)
+
+    def test_inbox_post_cached_author(self):
+        author_json = {
+            "type": "author",
+            "id": "http://127.0.0.1:5454/author/9de17f29c12e8f97bcbbd34cc908f1baba40658e",
+            "host": "http://127.0.0.1:5454/",
+            "displayName": "Lara Croft",
+            "url": "http://127.0.0.1:5454/author/9de17f29c12e8f97bcbbd34cc908f1baba40658e",
+        }
+        post_json = {
+            "type": "post",
+            "title": "A post",
+            "id": f"{author_json['id']}/posts/999999983dda1e11db47671c4a3bbd9e",
+            "source": "http://lastplaceigotthisfrom.com/posts/yyyyy",
+            "origin": "http://whereitcamefrom.com/posts/zzzzz",
+            "description": "Whatever",
+            "contentType": "text/plain",
+            "content": "Hello",
+            "author": author_json,
+            "categories": [],
+            "published": "2010-05-08T23:41:54.000Z",
+            "visibility": "PUBLIC",
+            "unlisted": False
+        }
+
+        # the author is cached when their first post is received
+        post = makeInboxPost(post_json)
+        author = Author.objects.get(url=author_json["id"])
+        self.assertEqual(post.cached_author, author)
+        self.assertEqual(author.displayName, "Lara Croft")
+
+        # and reused afterwards
+        post_json["id"] = f"{author_json['id']}/posts/another"
+        self.assertEqual(makeInboxPost(post_json).cached_author, author)
+        self.assertEqual(Author.objects.filter(url=author_json["id"]).count(), 1)
+        self.assertEqual(author.received_posts.count(), 2)
+
+
+class CursorPaginationTests(TestCase):
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        author = mixer.blend(LocalAuthor, user=None)
+        published = datetime.datetime(2021, 12, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+        # two posts share each published date, so the id breaks the tie
+        self.posts = [
+            mixer.blend(LocalPost, author=author, published=published + datetime.timedelta(minutes=i // 2))
+            for i in range(7)
+        ]
+        self.expected = sorted(self.posts, key=lambda post: (post.published, post.id), reverse=True)
+
+    def test_pages(self):
+        ordering = ['-published', '-id']
+        seen = []
+        cursor = None
+        for i in range(4):
+            items, cursor = getCursorPaginated(LocalPost.objects.all(), ordering, 2, cursor)
+            seen.extend(items)
+            if cursor is None:
+                break
+
+        self.assertIsNone(cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_new_items_do_not_shift_pages(self):
+        ordering = ['-published', '-id']
+        first, cursor = getCursorPaginated(LocalPost.objects.all(), ordering, 3)
+
+        # a newer post arrives between two page requests
+        mixer.blend(LocalPost, author=self.posts[0].author, published=datetime.datetime.now(timezone.utc))
+
+        second, cursor = getCursorPaginated(LocalPost.objects.all(), ordering, 3, cursor)
+        self.assertEqual(first + second, self.expected[:6])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            getCursorPaginated(LocalPost.objects.all(), ['-published', '-id'], 2, "not a cursor")
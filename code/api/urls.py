@@ -5,6 +5,7 @@ from .views import *
 app_name = 'api'
 urlpatterns = [
     path('', index, name='index'),
+    path('nodes/status', node_status, name='node-status'),
     path('authors/', AuthorsView.as_view(), name='authors'),
     path('author/<uuid:author_id>', AuthorView.as_view(), name='author'),
     path('author/<uuid:author_id>/followers', FollowersView.as_view(), name='followers'),
@@ -1,8 +1,12 @@
 import base64
 import json
 from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q
 
 from dateutil import parser
+from urllib.parse import urlencode
+import datetime
+import hashlib
 import logging
 
 from socialDistribution.models import *
@@ -21,6 +25,190 @@ def getPaginated(data, page, size):
         return []
 
 
+# Cursor (keyset) pagination. Instead of counting rows and skipping `(page - 1) * size` of them, the
+# next page continues after the last item of the previous page, which is encoded in an opaque cursor.
+# Pages stay fast no matter how deep they are, and items do not shift between pages when new ones arrive.
+# The legacy `page` parameter still uses getPaginated. Clients opt in with a `cursor` parameter, which
+# is empty for the first page, so existing clients that only send `size` get the same response as before.
+# Markus Winand, "We need tool support for keyset pagination", https://use-the-index-luke.com/no-offset
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def isCursorPaginated(request):
+    """ Checks if a request asks for cursor pagination: a cursor parameter, empty for the first page. """
+
+    return "cursor" in request.GET
+
+
+def encodeCursor(values):
+    """ Encodes the values of the ordering fields of an item as an opaque cursor. """
+
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else str(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decodeCursor(cursor, length):
+    """ Decodes a cursor made by encodeCursor. Raises ValueError if the cursor is malformed. """
+
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("Malformed query: invalid cursor")
+
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Malformed query: invalid cursor")
+    return values
+
+
+def getCursorPaginated(data, ordering, size, cursor=None):
+    """ Gets the page of a queryset that follows the item encoded in cursor.
+
+        Parameters:
+         - data (QuerySet): The items to paginate
+         - ordering (list): Field names to order by, prefixed with '-' for descending order. The last
+           field must be unique (e.g. ['-published', '-id'])
+         - size (int): Number of items per page
+         - cursor (string): Cursor returned with the previous page (default is None, the first page)
+
+        Returns:
+         - (list): The items of the page
+         - (string): Cursor of the next page, None if this is the last page
+    """
+
+    fields = [field.lstrip('-') for field in ordering]
+
+    if cursor:
+        values = decodeCursor(cursor, len(ordering))
+
+        # items that come after the cursor: (a > x) or (a = x and b > y) or ...
+        after = Q()
+        for i, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = Q(**{f'{fields[i]}__{lookup}': values[i]})
+            for previous, value in zip(fields[:i], values[:i]):
+                condition &= Q(**{previous: value})
+            after |= condition
+        try:
+            data = data.filter(after)
+        except Exception:
+            raise ValueError("Malformed query: invalid cursor")
+
+    # fetch one extra item to find out if there is a next page
+    items = list(data.order_by(*ordering)[:size + 1])
+    if len(items) <= size:
+        return items, None
+
+    items = items[:size]
+    return items, encodeCursor([getattr(items[-1], field) for field in fields])
+
+
+def getCursorPage(request, data, ordering):
+    """ Reads the size and cursor parameters of a request and gets the page of data.
+
+        Returns:
+         - (list): The items of the page
+         - (int): The page size
+         - (string): URL of the next page, None if this is the last page
+
+        Raises ValueError if size or cursor is malformed.
+    """
+
+    try:
+        size = int(request.GET.get("size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Malformed query: size must be an integer")
+    if size < 1:
+        raise ValueError("Malformed query: size must be > 0")
+
+    items, cursor = getCursorPaginated(data, ordering, size, request.GET.get("cursor"))
+
+    next_url = None
+    if cursor is not None:
+        next_url = request.build_absolute_uri(request.path) + '?' + urlencode({"size": size, "cursor": cursor})
+
+    return items, size, next_url
+
+
+def make_etag(*parts):
+    """ Builds an ETag from the values that identify the version of a response. """
+
+    version = "|".join(str(part) for part in parts)
+    return hashlib.sha1(version.encode('utf-8')).hexdigest()
+
+
+# The functions below compute the validators (ETag, Last-Modified) of API responses from row timestamps
+# and counts, without serializing the response. They are used with api.decorators.conditional_get.
+# Lists (and posts, which include comments) only get an ETag: removing an item from a list does not make
+# its latest timestamp any newer.
+
+def author_validators(request, author_id):
+    """ Validators for the JSON of a single author. """
+
+    updated = LocalAuthor.objects.filter(id=author_id).values_list('_last_updated', flat=True).first()
+    if updated is None:
+        return None, None
+
+    return make_etag('author', author_id, updated.isoformat()), updated
+
+
+def post_validators(request, author_id, post_id):
+    """ Validators for the JSON of a single post, which includes its author and most recent comments.
+        Only gets an ETag, like the lists: deleting a comment or changing a counter does not make any
+        of the timestamps newer.
+    """
+
+    version = LocalPost.objects.filter(id=post_id).aggregate(
+        updated=Max('_last_updated'),
+        likes=Max('like_count'),
+        comment_count=Max('comment_count'),
+        author_updated=Max('author___last_updated'),
+        comments=Count('comment'),
+        last_comment=Max('comment__pub_date'),
+        commenter_updated=Max('comment__author___last_updated'),
+    )
+    if version['updated'] is None:
+        return None, None
+
+    return make_etag('post', post_id, *version.values()), None
+
+
+def posts_validators(request, author_id):
+    """ Validators for the list of public posts of an author. """
+
+    version = LocalPost.objects.listed().get_public().filter(author_id=author_id).aggregate(
+        posts=Count('id', distinct=True),
+        updated=Max('_last_updated'),
+        author_updated=Max('author___last_updated'),
+        comments=Count('comment', distinct=True),
+        last_comment=Max('comment__pub_date'),
+        commenter_updated=Max('comment__author___last_updated'),
+    )
+    return make_etag('posts', author_id, request.GET.urlencode(), *version.values()), None
+
+
+def followers_validators(request, author_id):
+    """ Validators for the list of followers of an author. """
+
+    version = Follow.objects.filter(object_id=author_id).aggregate(
+        follows=Count('id'),
+        updated=Max('_last_updated'),
+        actor_updated=Max('actor___last_updated'),
+    )
+    return make_etag('followers', author_id, request.GET.urlencode(), *version.values()), None
+
+
+def comments_validators(request, author_id, post_id):
+    """ Validators for the list of comments on a post. """
+
+    version = Comment.objects.filter(post_id=post_id).aggregate(
+        comments=Count('id'),
+        last_comment=Max('pub_date'),
+        author_updated=Max('author___last_updated'),
+    )
+    return make_etag('comments', post_id, request.GET.urlencode(), *version.values()), None
+
+
 def makeLocalPost(data, author_id, post_id=None):
     """ 
     Creates a LocalPost given json data
@@ -62,27 +250,21 @@ def makeLocalPost(data, author_id, post_id=None):
         received_post.id = post_id
     received_post.save()
 
-    categories_to_remove = []
+    received_post.set_categories(data["categories"])
 
-    for category in data["categories"]:
-        if category != "":
-            category_obj, cat_created = Category.objects.get_or_create(
-                category__iexact=category,
-                defaults={"category": category}
-            )
-            received_post.categories.add(category_obj)
+    return received_post
 
-            # loop condition is always false if post was created
-            # because categories_to_remove is an empty list then
-            while category_obj.category in categories_to_remove:
-                categories_to_remove.remove(category_obj.category)      # don't remove this category
 
-    # won't execute if post was created
-    for category in categories_to_remove:
-        category_obj = Category.objects.get(category=category)
-        received_post.categories.remove(category_obj)
+def getPostAuthor(author_json):
+    """
+    Gets the cached Author of a received post, creating it from the author JSON in the post if it is not cached yet.
+    """
 
-    return received_post
+    post_author = Author.objects.filter(url=author_json["id"]).first()
+    if post_author is None:
+        post_author = Author.objects.create(url=author_json["id"])
+        post_author.update_with_json(author_json)
+    return post_author
 
 
 def makeInboxPost(data):
@@ -124,6 +306,9 @@ def makeInboxPost(data):
     date_string = validated_data.get("published")
     published = parser.parse(date_string) if date_string is not None else None
 
+    # link the post to the cached author, caching the author if it is new
+    post_author = getPostAuthor(validated_data["author"])
+
     received_post, post_created = InboxPost.objects.get_or_create(
         public_id=validated_data["id"],
         defaults={
@@ -135,6 +320,7 @@ def makeInboxPost(data):
             "content_type": contentType,
             "content": content,
             "author": validated_data["author"]["id"],
+            "cached_author": post_author,
             "_author_json": validated_data["author"],
             "published": published,
             "visibility": InboxPost.Visibility.get_visibility_choice(validated_data["visibility"]),
@@ -142,28 +328,10 @@ def makeInboxPost(data):
         }
     )
 
-    if not post_created:
-        categories_to_remove = [category_obj.category
-                                for category_obj in received_post.categories.all()]
-    else:
-        categories_to_remove = []
-
-    for category in validated_data["categories"]:
-        if category != "":
-            category_obj, cat_created = Category.objects.get_or_create(
-                category__iexact=category,
-                defaults={"category": category}
-            )
-            received_post.categories.add(category_obj)
-
-            # loop condition is always false if post was created
-            # because categories_to_remove is an empty list then
-            while category_obj.category in categories_to_remove:
-                categories_to_remove.remove(category_obj.category)      # don't remove this category
-
-    # won't execute if post was created
-    for category in categories_to_remove:
-        category_obj = Category.objects.get(category=category)
-        received_post.categories.remove(category_obj)
+    if not post_created and received_post.cached_author_id != post_author.id:
+        received_post.cached_author = post_author
+        received_post.save(update_fields=['cached_author'])
+
+    received_post.set_categories(validated_data["categories"])
 
     return received_post
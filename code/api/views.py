@@ -2,6 +2,7 @@ import base64
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http.response import *
 from django.http import HttpResponse, JsonResponse
 from django.http.response import HttpResponseBadRequest
@@ -17,10 +18,13 @@ import base64
 
 from cmput404.constants import API_BASE
 import socialDistribution.requests as api_requests
+from socialDistribution.executors import fetch_executor
+from socialDistribution.fetchers import fetch_post_author_updates
 from socialDistribution.models import *
-from .decorators import validate_user, validate_node
+from .decorators import validate_user, validate_node, conditional_get
 from .parsers import url_parser
-from .utility import getPaginated, makeInboxPost, makeLocalPost
+from .utility import getPaginated, getCursorPage, isCursorPaginated, makeInboxPost, makeLocalPost
+from .utility import author_validators, post_validators, posts_validators, followers_validators, comments_validators
 
 # References for entire file:
 # Django Software Foundation, "Introduction to class-based views", 2021-10-13
@@ -51,6 +55,21 @@ def index(request):
     return JsonResponse(response)
 
 
+def node_status(request):
+    """ GET - Get the state of the circuit breaker of every remote node contacted by this server process,
+        and metrics of the background fetcher queue. Only available to staff users.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    response = {
+        "type": "nodes",
+        "items": api_requests.get_circuit_states(),
+        "fetcher": fetch_executor.stats()
+    }
+    return JsonResponse(response)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AuthorsView(View):
 
@@ -58,14 +77,22 @@ class AuthorsView(View):
         """ GET - Retrieve all user profiles
             'page' is indexed from 1, NOT 0.
             'size' must be greater than 0
+            'cursor' is the cursor of the next page returned in 'next', empty for the first page
         """
         logger.info(f"GET /authors API endpoint invoked")
 
         authors = LocalAuthor.objects.order_by('created_date')
         page = request.GET.get("page")
         size = request.GET.get("size")
+        next_url = None
+
+        if isCursorPaginated(request):
+            try:
+                authors, size, next_url = getCursorPage(request, authors, ['created_date', 'id'])
+            except ValueError as e:
+                return HttpResponseBadRequest(e)
 
-        if page and size:
+        elif page and size:
             page = int(page)
             size = int(size)
             try:
@@ -81,6 +108,8 @@ class AuthorsView(View):
             "type": "authors",
             "items": authors
         }
+        if isCursorPaginated(request):
+            response["next"] = next_url
 
         return JsonResponse(response)
 
@@ -88,6 +117,7 @@ class AuthorsView(View):
 @method_decorator(csrf_exempt, name='dispatch')
 class AuthorView(View):
 
+    @method_decorator(conditional_get(author_validators))
     def get(self, request, author_id):
         """ GET - Retrieve profile of {author_id} """
         logger.info(f"GET /authors/{author_id} API endpoint invoked")
@@ -139,17 +169,31 @@ class AuthorView(View):
 @method_decorator(csrf_exempt, name='dispatch')
 class FollowersView(View):
 
+    @method_decorator(conditional_get(followers_validators))
     def get(self, request, author_id):
-        """ GET - Get a list of authors who are the followers of {author_id} """
+        """ GET - Get a list of authors who are the followers of {author_id}
+            All followers are sent unless 'cursor' is given (empty for the first page).
+        """
         logger.info(f"GET /authors/{author_id}/followers API endpoint invoked")
 
         author = get_object_or_404(LocalAuthor, pk=author_id)
-        followers = [follow.actor.as_json() for follow in author.follows.all()]
+        follows = author.follows.select_related('actor')
+        next_url = None
+
+        if isCursorPaginated(request):
+            try:
+                follows, size, next_url = getCursorPage(request, follows, ['id'])
+            except ValueError as e:
+                return HttpResponseBadRequest(e)
+
+        followers = [follow.actor.as_json() for follow in follows]
 
         response = {
             "type": "followers",
             "items": followers
         }
+        if isCursorPaginated(request):
+            response["next"] = next_url
 
         return JsonResponse(response)
 
@@ -268,6 +312,7 @@ class LikedView(View):
 @method_decorator(csrf_exempt, name='dispatch')
 class PostsView(View):
 
+    @method_decorator(conditional_get(posts_validators))
     def get(self, request, author_id):
         logger.info(f"GET /author/{author_id}/posts API endpoint invoked")
 
@@ -278,8 +323,15 @@ class PostsView(View):
             page = request.GET.get("page")
             size = request.GET.get("size")
             posts = LocalPost.objects.listed().get_public().filter(author=author).order_by('pk')
+            next_url = None
 
-            if page and size:
+            if isCursorPaginated(request):
+                try:
+                    posts, size, next_url = getCursorPage(request, posts, ['-published', '-id'])
+                except ValueError as e:
+                    return HttpResponseBadRequest(e)
+
+            elif page and size:
                 page = int(page)
                 size = int(size)
                 try:
@@ -291,7 +343,7 @@ class PostsView(View):
                     return HttpResponseBadRequest()
                 posts = getPaginated(posts, page, size)
 
-            posts = [post.as_json() for post in posts]
+            posts = LocalPost.bulk_as_json(posts)
 
             response = {
                 "type": "posts",
@@ -299,6 +351,8 @@ class PostsView(View):
                 "size": size,
                 "items": posts
             }
+            if isCursorPaginated(request):
+                response["next"] = next_url
 
         except Exception as e:
             logger.error(e, exc_info=True)
@@ -332,6 +386,8 @@ class PostsView(View):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class PostView(View):
+
+    @method_decorator(conditional_get(post_validators))
     def get(self, request, author_id, post_id):
         """ GET - Get json for post {post_id} """
         logger.info(f"GET /author/{author_id}/posts/{post_id} API endpoint invoked")
@@ -386,26 +442,7 @@ class PostView(View):
             categories = data['categories']
 
             if categories is not None:
-                categories_to_remove = [cat.category for cat in post.categories.all()]
-
-                """
-                This implementation makes category names case-insensitive.
-                This makes handling Category objects cleaner, albeit slightly more
-                involved.
-                """
-                for category in categories:
-                    category_obj, created = Category.objects.get_or_create(
-                        category__iexact=category,
-                        defaults={'category': category}
-                    )
-                    post.categories.add(category_obj)
-
-                    while category_obj.category in categories_to_remove:
-                        categories_to_remove.remove(category_obj.category)     # don't remove this category
-
-                for category in categories_to_remove:
-                    category_obj = Category.objects.get(category=category)
-                    post.categories.remove(category_obj)
+                post.set_categories(categories)
 
             post.save()
             return JsonResponse(status=201, data=post.as_json())
@@ -491,6 +528,7 @@ class PostCommentsView(View):
         HANDLE Comment GET and POST
     '''
 
+    @method_decorator(conditional_get(comments_validators))
     def get(self, request, author_id, post_id):
         logger.info(f"GET /author/{author_id}/posts/{post_id}/comments API endpoint invoked")
 
@@ -506,8 +544,15 @@ class PostCommentsView(View):
                 return HttpResponseNotFound()
 
             comments = post.comments()
+            next_url = None
 
-            if page and size:
+            if isCursorPaginated(request):
+                try:
+                    comments, size, next_url = getCursorPage(request, comments, ['-pub_date', '-id'])
+                except ValueError as e:
+                    return HttpResponseBadRequest(e)
+
+            elif page and size:
                 page = int(page)
                 size = int(size)
                 try:
@@ -530,6 +575,8 @@ class PostCommentsView(View):
                 "id": f"{API_BASE}/author/{author_id}/posts/{post_id}/comments",
                 "comments": comments
             }
+            if isCursorPaginated(request):
+                response["next"] = next_url
 
         except Exception as e:
             logger.error(e, exc_info=True)
@@ -630,9 +677,16 @@ class InboxView(View):
         try:
             page = request.GET.get("page")
             size = request.GET.get("size")
-            posts = author.inbox_posts.all().order_by('-published')
+            posts = author.inbox_posts.select_related('cached_author').order_by('-published')
+            next_url = None
+
+            if isCursorPaginated(request):
+                try:
+                    posts, size, next_url = getCursorPage(request, posts, ['-published', '-id'])
+                except ValueError as e:
+                    return HttpResponseBadRequest(e)
 
-            if page and size:
+            elif page and size:
                 page = int(page)
                 size = int(size)
                 try:
@@ -642,7 +696,10 @@ class InboxView(View):
                     return HttpResponseBadRequest(e)
                 posts = getPaginated(posts, page, size)
 
-            posts = [post.as_json() for post in posts]
+            # author data is served from the local cache and refreshed in the background
+            posts = list(posts)
+            fetch_post_author_updates(posts)
+            posts = InboxPost.bulk_as_json(posts)
 
             response = {
                 "type": "inbox",
@@ -651,6 +708,8 @@ class InboxView(View):
                 "size": size,
                 "items": posts
             }
+            if isCursorPaginated(request):
+                response["next"] = next_url
 
         except Exception as e:
             logger.error(e, exc_info=True)
@@ -745,13 +804,15 @@ class InboxView(View):
                 except (LocalPost.DoesNotExist, Comment.DoesNotExist):
                     raise ValueError("'object' does not exist")
 
-                if context_object.likes.filter(author=liking_author).exists():
-                    # if like already exists, remove it
-                    like = context_object.likes.get(author=liking_author)
-                    like.delete()
-                else:
-                    # create a new like from liking_author on object
-                    context_object.likes.create(author=liking_author, object=context_object)
+                # the like and the like counter of the object change together (see socialDistribution/signals.py)
+                with transaction.atomic():
+                    like = context_object.likes.filter(author=liking_author).first()
+                    if like is not None:
+                        # if like already exists, remove it
+                        like.delete()
+                    else:
+                        # create a new like from liking_author on object
+                        context_object.likes.create(author=liking_author, object=context_object)
 
                 return HttpResponse(status=200)
 
@@ -777,14 +838,15 @@ class InboxView(View):
                 except LocalPost.DoesNotExist:
                     raise ValueError("'object' does not exist")
 
-                # add remote comment
-                Comment.objects.create(
-                    author=commenting_author,
-                    post=post,
-                    comment=data['comment'],
-                    content_type=data['contentType'],
-                    pub_date=datetime.now(timezone.utc),
-                )
+                # add remote comment (and count it, see socialDistribution/signals.py)
+                with transaction.atomic():
+                    Comment.objects.create(
+                        author=commenting_author,
+                        post=post,
+                        comment=data['comment'],
+                        content_type=data['contentType'],
+                        pub_date=datetime.now(timezone.utc),
+                    )
 
                 return HttpResponse(status=200)
             else:
@@ -11,4 +11,11 @@ admin.site.register(Comment)
 admin.site.register(PostLike)
 admin.site.register(CommentLike)
 admin.site.register(Category)
-admin.site.register(Follow)
\ No newline at end of file
+admin.site.register(Follow)
+
+class OutboxItemAdmin(admin.ModelAdmin):
+    list_display = ['url', 'status', 'attempts', 'last_status_code', 'next_attempt', 'created_date']
+    list_filter = ['status', 'host']
+    search_fields = ['url']
+
+admin.site.register(OutboxItem, OutboxItemAdmin)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SocialdistributionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'socialDistribution'
+
+    def ready(self):
+        # register signal handlers
+        from . import signals
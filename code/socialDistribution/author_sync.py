@@ -0,0 +1,194 @@
+""" This file contains methods that synchronize the locally cached remote authors with the
+    /authors/ listings of the connected remote nodes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.utils import timezone
+
+import logging
+
+from cmput404.constants import SCHEME, HOST
+import socialDistribution.requests as api_requests
+from socialDistribution.models import Author
+from api.models import Node
+
+logger = logging.getLogger(__name__)
+
+# number of authors requested per page
+SYNC_PAGE_SIZE = 100
+
+# upper bound on the number of pages fetched from one node
+SYNC_MAX_PAGES = 100
+
+# number of nodes that are fetched from at the same time
+MAX_SYNC_WORKERS = 8
+
+# number of rows per bulk insert / update query
+BULK_BATCH_SIZE = 500
+
+# Author fields that are copied from the JSON representation of a remote author
+SYNCED_FIELDS = {
+    "displayName": "displayName",
+    "host": "host",
+    "github": "githubUrl",
+    "profileImage": "profileImageUrl",
+}
+
+
+def fetch_node_authors(node):
+    """ Fetches the /authors/ listing of a remote node one page at a time.
+
+        Fetching stops at the first empty or short page, or when a node that does not support
+        pagination returns the same page again.
+
+        Parameters:
+         - node (api.models.Node): The node to fetch authors from
+
+        Returns:
+         - (list): JSON representations of the authors of the node
+    """
+
+    server_url = f'{SCHEME}://{node.host}{node.api_prefix}'
+    authors_endpoint = server_url.strip('/') + '/authors/'
+
+    authors = []
+    previous_ids = None
+
+    try:
+        for page in range(1, SYNC_MAX_PAGES + 1):
+            params = {"page": page, "size": SYNC_PAGE_SIZE}
+            res_code, res_body = api_requests.get(authors_endpoint, params=params, cached=True)
+
+            # skip rest of node if unresponsive
+            if res_body is None or not isinstance(res_body.get("items"), list):
+                break
+
+            items = [item for item in res_body["items"] if isinstance(item, dict) and item.get("id")]
+            ids = [item["id"] for item in items]
+            if not ids or ids == previous_ids:
+                break
+
+            authors.extend(items)
+            previous_ids = ids
+
+            if len(res_body["items"]) < SYNC_PAGE_SIZE:
+                break
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+
+    finally:
+        # worker threads must close their own database connection
+        connection.close()
+
+    return authors
+
+
+def diff_authors(remote_authors):
+    """ Compares the JSON representations of remote authors with the stored authors.
+
+        Parameters:
+         - remote_authors (list): JSON representations of remote authors
+
+        Returns:
+         - (list): New Author objects that are not stored yet
+         - (list): Stored Author objects that were changed (only for authors whose data differs)
+    """
+
+    # the last occurrence of an author wins
+    by_url = {author["id"]: author for author in remote_authors}
+
+    stored = {}
+    urls = list(by_url.keys())
+    for i in range(0, len(urls), BULK_BATCH_SIZE):
+        for author in Author.objects.filter(url__in=urls[i:i + BULK_BATCH_SIZE]):
+            stored.setdefault(author.url, []).append(author)
+
+    to_create = []
+    to_update = []
+    for url, data in by_url.items():
+        if url not in stored:
+            author = Author(url=url)
+            apply_author_json(author, data)
+            to_create.append(author)
+            continue
+
+        for author in stored[url]:
+            # local authors are always up to date
+            if author._always_up_to_date:
+                continue
+            if apply_author_json(author, data):
+                to_update.append(author)
+
+    return to_create, to_update
+
+
+def apply_author_json(author, data):
+    """ Copies the fields of the JSON representation of an author onto an Author, like
+        Author.update_with_json but without saving. Returns true if any field changed.
+    """
+
+    changed = False
+    for key, field in SYNCED_FIELDS.items():
+        value = data.get(key)
+        if value and getattr(author, field) != value:
+            setattr(author, field, value)
+            changed = True
+    return changed
+
+
+def apply_author_diff(to_create, to_update):
+    """ Writes the result of diff_authors with bulk queries. """
+
+    now = timezone.now()
+    with transaction.atomic():
+        Author.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+
+        # bulk_update does not set auto_now fields
+        for author in to_update:
+            author._last_updated = now
+        Author.objects.bulk_update(
+            to_update,
+            list(SYNCED_FIELDS.values()) + ["_last_updated"],
+            batch_size=BULK_BATCH_SIZE
+        )
+
+
+def cache_authors(authors):
+    """ Stores the new and changed authors of a list of author JSON (e.g. the commenters of a post)
+        with bulk queries.
+
+        Returns:
+         - (dict): The cached Author of each author URL
+    """
+
+    apply_author_diff(*diff_authors(authors))
+
+    cached = {}
+    for author in Author.objects.filter(url__in={author["id"] for author in authors}):
+        cached.setdefault(author.url, author)
+    return cached
+
+
+def sync_remote_authors():
+    """ Fetches the authors of all connected remote nodes in parallel and stores the new and changed ones.
+
+        Returns:
+         - (dict): Number of fetched, created and updated authors
+    """
+
+    nodes = list(Node.objects.filter(remote_credentials=True).exclude(host=HOST))
+    if not nodes:
+        return {"fetched": 0, "created": 0, "updated": 0}
+
+    with ThreadPoolExecutor(max_workers=min(len(nodes), MAX_SYNC_WORKERS)) as executor:
+        results = list(executor.map(fetch_node_authors, nodes))
+
+    remote_authors = [author for authors in results for author in authors]
+    to_create, to_update = diff_authors(remote_authors)
+    apply_author_diff(to_create, to_update)
+
+    summary = {"fetched": len(remote_authors), "created": len(to_create), "updated": len(to_update)}
+    logger.info(f"Synced remote authors from {len(nodes)} nodes: {summary}")
+    return summary
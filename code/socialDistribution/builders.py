@@ -28,6 +28,9 @@ class PostBuilder:
         self.__post.origin = self.__post.get_id()
         self.__post.source = self.__post.get_id()
         self.__post.save()
+
+        # load the like counter that was updated by likes()
+        self.__post.refresh_from_db()
         return self.__post
 
     def authorId(self, id):
@@ -1,43 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection, transaction
+from django.utils import timezone
 from typing import List
 import logging
+import threading
 
 import socialDistribution.requests as api_requests
-from .models import LocalPost, Author, LocalAuthor
+from .models import LocalPost, Author, LocalAuthor, OutboxItem
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of inboxes that outbox items are delivered to at the same time. Items for a single
+# inbox are delivered one at a time so that the inbox receives them in order; api_requests.host_limit
+# caps the number of concurrent requests to each host.
+MAX_DELIVERY_WORKERS = 16
+
+# Python Software Foundation, "ThreadPoolExecutor",
+# https://docs.python.org/3/library/concurrent.futures.html#threadpoolexecutor
+_delivery_executor = ThreadPoolExecutor(max_workers=MAX_DELIVERY_WORKERS, thread_name_prefix="dispatch")
+
+# Runs outbox passes started by web requests, one at a time
+_outbox_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+_outbox_pass_pending = threading.Event()
+
+
+def deliver(url: str, data: dict):
+    """ Sends data to the inbox at the given URL via a POST request, waiting for a free
+        slot for the host of the inbox first. Returns the status code of the response.
+    """
+
+    with api_requests.host_limit(url):
+        status_code, response_body = api_requests.post(url=url, data=data, send_basic_auth_header=True)
+    return status_code
+
+
+def invalidate_delivered(data: dict):
+    """ Removes cached responses that a delivered activity made out of date. Only runs once the
+        activity was delivered, so that the next GET does not cache the state from before it.
+    """
+
+    activity_type = str(data.get("type", "")).lower()
+    if not data.get("object"):
+        return
+
+    # the likes of the liked post or comment
+    if activity_type == "like":
+        api_requests.invalidate(data["object"].strip('/') + '/likes')
+
+    # the comments of the commented post, so that the author sees their comment right away
+    elif activity_type == "comment":
+        api_requests.invalidate(data["object"].strip('/') + '/comments')
+
+
+def _next_outbox_item(url: str):
+    """ Claims the oldest undelivered outbox item for the inbox at url. Returns None if there is no
+        item, if the oldest item is not due yet or if another worker is currently delivering to the
+        inbox. Items behind the oldest one are never skipped so that each inbox receives activities
+        in order. A failing inbox does not hold back other inboxes on the same host.
+    """
+
+    item = OutboxItem.objects.filter(
+        url=url,
+        status__in=[OutboxItem.Status.PENDING, OutboxItem.Status.SENDING]
+    ).first()
+
+    if item is None or not item.is_due():
+        return None
+
+    if item.status == OutboxItem.Status.SENDING and not item.is_claim_expired():
+        return None
+
+    # claim the item, this fails if another worker claimed it first
+    claimed = OutboxItem.objects.filter(id=item.id, status=item.status, claimed_at=item.claimed_at).update(
+        status=OutboxItem.Status.SENDING,
+        claimed_at=timezone.now()
+    )
+    return item if claimed else None
+
+
+def _drain_inbox(url: str):
+    """ Delivers outbox items for the inbox at url one at a time, in order, until the outbox for the
+        inbox is empty or a delivery fails. Returns the number of delivered items.
+    """
+
+    delivered = 0
+    try:
+        item = _next_outbox_item(url)
+        while item is not None:
+            try:
+                status_code = deliver(item.url, item.data)
+            except Exception as e:
+                logger.error(e, exc_info=True)
+                status_code = 500
+
+            if 200 <= status_code < 300:
+                item.delete()
+                invalidate_delivered(item.data)
+                delivered += 1
+                item = _next_outbox_item(url)
+            else:
+                logger.warning(f"Failed to deliver outbox item {item.id} to {item.url} ({status_code})")
+                item.record_failure(status_code)
+                item = None
+
+    finally:
+        # runs in worker threads, which must close their own database connection
+        connection.close()
+
+    return delivered
+
+
+def process_outbox():
+    """ Delivers all due outbox items. Inboxes are drained concurrently and items for the same inbox
+        are delivered in the order they were enqueued. Returns the number of delivered items.
+    """
+
+    urls = OutboxItem.objects.filter(
+        status__in=[OutboxItem.Status.PENDING, OutboxItem.Status.SENDING]
+    ).values_list('url', flat=True).distinct()
+
+    futures = [_delivery_executor.submit(_drain_inbox, url) for url in set(urls)]
+
+    delivered = 0
+    for future in futures:
+        try:
+            delivered += future.result()
+        except Exception as e:
+            logger.error(e, exc_info=True)
+
+    if delivered:
+        logger.info(f"Delivered {delivered} outbox items")
+    return delivered
+
+
+def _process_outbox_in_background():
+    """ Runs process_outbox in the background thread. """
+
+    _outbox_pass_pending.clear()
+    try:
+        process_outbox()
+    except Exception as e:
+        logger.error(e, exc_info=True)
+    finally:
+        connection.close()
+
+
+def flush_outbox():
+    """ Asynchronously delivers all due outbox items. Does not wait for the delivery to finish. A
+        separate worker (manage.py process_outbox) retries failed deliveries.
+    """
+
+    # don't queue another pass if one is already waiting to start
+    if not _outbox_pass_pending.is_set():
+        _outbox_pass_pending.set()
+        _outbox_executor.submit(_process_outbox_in_background)
+
+
+def dispatch_activity(url: str, data: dict):
+    """ Adds an activity (post, follow request, like, comment) for the given inbox URL to the outbox
+        and schedules its delivery. Returns right away.
+    """
+
+    logger.info(f"Queueing {data.get('type')} for {url}")
+
+    OutboxItem.enqueue(url, data)
+
+    # only start delivering once the item is visible to other database connections
+    transaction.on_commit(flush_outbox)
+
+
 def send_post(post: LocalPost, url: str):
-    """ Sends a post to the given URL via a POST request. """
+    """ Sends a post to the given URL via the outbox. """
     logger.info(f"Sending post {post.get_id()} to {url}")
 
-    data = post.as_json()
-    api_requests.post(url=url, data=data, send_basic_auth_header=True)
+    data = LocalPost.bulk_as_json([post])[0]
+    dispatch_activity(url, data)
 
 def dispatch_post(post: LocalPost, recipients: List[LocalAuthor] = None,):
-    """ Sends a post to the inbox of all followers who have permission to view the post.
+    """ Sends a post to the inbox of all followers who have permission to view the post. The post
+        is added to the outbox once per inbox and delivered in the background.
 
     Parameters:
         post (LocalPost): the post to be sent out
         recipients (QuerySet of LocalAuthor): the list of authors to receive the post if the post is private
+
+    Returns:
+        the list of inbox URLs that the post was queued for
     """
 
     if post.visibility == LocalPost.Visibility.PUBLIC:
         # send posts to all followers
-        for follower in post.author.get_followers():
-            url = follower.get_inbox()
-            send_post(post, url)
+        receivers = post.author.get_followers()
 
     elif post.visibility == LocalPost.Visibility.FRIENDS:
         # send posts to friends
-        for friend in post.author.get_friends():
-            url = friend.get_inbox()
-            send_post(post, url)
+        receivers = post.author.get_friends()
 
     elif post.visibility == LocalPost.Visibility.PRIVATE:
         # send posts to private recipients
-        for follower in recipients:
-            url = follower.get_inbox()
-            send_post(post, url)
+        receivers = recipients or []
+
+    else:
+        receivers = []
+
+    urls = sorted(set(receiver.get_inbox() for receiver in receivers))
+    if not urls:
+        return []
+
+    logger.info(f"Queueing post {post.get_id()} for {len(urls)} inboxes")
+
+    data = LocalPost.bulk_as_json([post])[0]
+    with transaction.atomic():
+        for url in urls:
+            OutboxItem.enqueue(url, data)
+        transaction.on_commit(flush_outbox)
+
+    return urls
 
 def dispatch_follow_request(actor: LocalAuthor, object: Author):
     """ Sends a follow request to the inbox of another author.
@@ -47,7 +225,7 @@ def dispatch_follow_request(actor: LocalAuthor, object: Author):
         object (Author): the author that is receiving the request
 
     Returns:
-        true if the follow request returns a success code, false otherwise
+        true if the follow request was queued, false otherwise
     """
 
     actor_json = actor.as_json()
@@ -59,7 +237,7 @@ def dispatch_follow_request(actor: LocalAuthor, object: Author):
 
     object_inbox = object.get_inbox()
 
-    logger.info(f"Sending follow request from {actor.get_url_id()} to {object_inbox}")
+    logger.info(f"Queueing follow request from {actor.get_url_id()} to {object_inbox}")
 
     data = {
         "type": "Follow",
@@ -68,9 +246,5 @@ def dispatch_follow_request(actor: LocalAuthor, object: Author):
         "object": object_json
     }
 
-    status_code, response_body = api_requests.post(url=object_inbox, data=data, send_basic_auth_header=True)
-
-    if status_code >=200 and status_code < 300:
-        return True
-    else:
-        return False
+    dispatch_activity(object_inbox, data)
+    return True
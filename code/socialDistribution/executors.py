@@ -0,0 +1,140 @@
+""" This file contains a thread pool for running background tasks that de-duplicates tasks by key """
+
+from django.db import connection
+
+import atexit
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class KeyedExecutor:
+    """ Runs background tasks on a fixed number of worker threads fed by a bounded queue.
+
+        Every task has a key (e.g. ("author", author_id)). A task is not queued if a task with the
+        same key is already queued or running, so that a burst of requests for the same update only
+        results in one update. Tasks are also not queued if the queue is full.
+    """
+
+    # Python Software Foundation, "queue - A synchronized queue class",
+    # https://docs.python.org/3/library/queue.html
+
+    def __init__(self, name, max_workers, max_queue_size):
+        self.name = name
+        self.max_workers = max_workers
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._keys = set()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._is_shutdown = False
+
+        self._submitted = 0
+        self._deduplicated = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+
+    def submit(self, key, fn, *args, **kwargs):
+        """ Queues fn(*args, **kwargs) to run in the background. Returns true if the task was queued,
+            false if a task with the same key is already queued or running, or the queue is full.
+        """
+
+        with self._lock:
+            if self._is_shutdown:
+                return False
+
+            if key in self._keys:
+                self._deduplicated += 1
+                return False
+
+            try:
+                self._queue.put_nowait((key, fn, args, kwargs))
+            except queue.Full:
+                self._rejected += 1
+                logger.warning(f"{self.name} queue is full ({self._queue.qsize()} tasks), dropping task {key}")
+                return False
+
+            self._keys.add(key)
+            self._submitted += 1
+
+            # start workers lazily, up to max_workers
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f"{self.name}-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+            return True
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                # shutdown
+                return
+
+            key, fn, args, kwargs = task
+            try:
+                fn(*args, **kwargs)
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                logger.error(e, exc_info=True)
+                with self._lock:
+                    self._failed += 1
+            finally:
+                # worker threads must close their own database connection
+                connection.close()
+                with self._lock:
+                    self._keys.discard(key)
+
+    def stats(self):
+        """ Gets metrics about the executor. """
+
+        with self._lock:
+            return {
+                "name": self.name,
+                "workers": len(self._workers),
+                "queueDepth": self._queue.qsize(),
+                "inFlight": len(self._keys),
+                "submitted": self._submitted,
+                "deduplicated": self._deduplicated,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait=True, timeout=None, cancel_pending=False):
+        """ Stops accepting tasks and stops the workers once the queued tasks are done.
+            If cancel_pending is true, queued tasks that have not started yet are dropped.
+        """
+
+        with self._lock:
+            if self._is_shutdown:
+                return
+            self._is_shutdown = True
+            workers = list(self._workers)
+
+        if cancel_pending:
+            try:
+                while True:
+                    key, fn, args, kwargs = self._queue.get_nowait()
+                    with self._lock:
+                        self._keys.discard(key)
+            except queue.Empty:
+                pass
+
+        for worker in workers:
+            self._queue.put(None)
+
+        if wait:
+            for worker in workers:
+                worker.join(timeout)
+
+        logger.debug(f"{self.name} shut down")
+
+
+# Executor shared by the fetchers
+fetch_executor = KeyedExecutor("fetcher", max_workers=8, max_queue_size=200)
+atexit.register(fetch_executor.shutdown, wait=True, timeout=5, cancel_pending=True)
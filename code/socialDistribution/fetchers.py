@@ -1,11 +1,14 @@
 """ This file contains methods that asyncrohonously fetch update data for different data models """
 
 from django.db import connection
-import threading
+from django.utils import timezone
+import datetime
 import logging
 
 from cmput404.constants import SCHEME, HOST
 import socialDistribution.requests as api_requests
+from socialDistribution.author_sync import sync_remote_authors
+from socialDistribution.executors import fetch_executor
 from socialDistribution.models import *
 from api.models import *
 
@@ -17,47 +20,34 @@ logger = logging.getLogger(__name__)
 # "Can you perform multi-threaded tasks within Django?",
 # https://stackoverflow.com/a/53327191, CC BY-SA 4.0
 
+# seconds after which the cached author of a received post is refreshed from their home node
+POST_AUTHOR_TTL = 10 * 60
+
+# seconds between two checks of the same received post for edits and deletes
+POST_REFRESH_INTERVAL = 5 * 60
+
+# Updates run on the shared fetch_executor (see executors.py). Each update is keyed by what it
+# updates, so only one update of the same author or follow is queued or running at a time.
+
 
 def fetch_remote_authors():
     """ Asynchronously fetch all authors from the API endpoints of all connected remote nodes.
     """
 
-    # Start a thread that will get all remote authors
-    t = threading.Thread(target=update_remote_authors, args=[], daemon=True)
-    t.start()
+    # Queue a task that will get all remote authors
+    fetch_executor.submit(("remote-authors",), update_remote_authors)
 
 
 def update_remote_authors():
-    """ Makes series of API calls to get all authors on remote servers.
-
+    """ Makes series of API calls to get all authors on remote servers (see author_sync.py).
+        Authors deleted on their home node are removed by the liveness sweep (see liveness.py).
     """
 
     try:
         logger.info(f"Starting fetch for all remote authors")
 
-        # check remote nodes
-        for node in Node.objects.filter(remote_credentials=True).exclude(host=HOST):
-            server_url = f'{SCHEME}://{node.host}{node.api_prefix}'
-            authors_endpoint = server_url.strip('/') + '/authors/'
-            res_code, res_body = api_requests.get(authors_endpoint)
-
-            # skip node if unresponsive
-            if res_body is not None and res_body.get("items") is not None:
-
-                # add remote authors to local cache
-                for remote_author in res_body['items']:
-                    author, created = Author.objects.get_or_create(
-                        url=remote_author['id'],
-                    )
-                    author.update_with_json(data=remote_author)
-
-        # check for deleted authors 
-        for author in Author.objects.all():
-            if not author.up_to_date():
-                author_url = author.url.strip("/")
-                res_code, res_data = api_requests.get(author_url)
-                if res_code == 404 or res_code == 410:
-                    author.delete()
+        # add new and changed remote authors to local cache
+        sync_remote_authors()
 
     except Exception as e:
         logger.error(e, exc_info=True)
@@ -78,12 +68,27 @@ def fetch_author_update(author: Author):
     if author.up_to_date():
         return None
 
-    # Start a thread that will update data for author
-    t = threading.Thread(target=update_author, args=[author.id], daemon=True)
-    t.start()
+    # Queue a task that will update data for author
+    fetch_executor.submit(("author", author.id), update_author, author.id)
     return author.id
 
 
+def fetch_post_author_updates(posts):
+    """ Asynchronously refresh the cached authors of received posts whose data is older than POST_AUTHOR_TTL.
+        The posts should be loaded with their cached_author (select_related or prefetch_related).
+
+        Paramters:
+         - posts (list): InboxPosts that are being served
+    """
+
+    limit = timezone.now() - datetime.timedelta(seconds=POST_AUTHOR_TTL)
+    authors = {post.cached_author_id: post.cached_author for post in posts if post.cached_author_id is not None}
+
+    for author in authors.values():
+        if not author._always_up_to_date and author._last_updated < limit:
+            fetch_executor.submit(("author", author.id), update_author, author.id)
+
+
 def update_author(id):
     """ Makes API call to update author data for a given author
 
@@ -96,7 +101,7 @@ def update_author(id):
         logger.info(f"Starting update for {author}")
 
         # update author object
-        status_code, response_body = api_requests.get(author.url.strip("/"))
+        status_code, response_body = api_requests.get(author.url.strip("/"), cached=True)
         if status_code == 200 and response_body is not None:
             author.update_with_json(data=response_body)
 
@@ -111,6 +116,73 @@ def update_author(id):
         connection.close()
 
 
+def fetch_post_updates(posts):
+    """ Asynchronously check received public posts for edits and deletes on their home node, unless they
+        were checked in the last POST_REFRESH_INTERVAL seconds. Views render the stored posts right away,
+        and the changes show up on the next page load.
+
+        Paramters:
+         - posts (list): InboxPosts that are being served
+    """
+
+    limit = timezone.now() - datetime.timedelta(seconds=POST_REFRESH_INTERVAL)
+    for post in posts:
+        # only public posts can be fetched from their home node
+        if post.visibility != InboxPost.Visibility.PUBLIC:
+            continue
+
+        if post._last_checked is None or post._last_checked < limit:
+            fetch_executor.submit(("post", post.id), update_post, post.id)
+
+
+def update_post(id):
+    """ Makes API call to update a received post (see InboxPost.fetch_update)
+
+        Parameters:
+         - id (UUID): the ID of the InboxPost to update
+    """
+
+    try:
+        post = InboxPost.objects.get(id=id)
+        post.fetch_update()
+
+    except InboxPost.DoesNotExist:
+        pass
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+
+    finally:
+        connection.close()
+
+
+def fetch_comments_update(comments_url):
+    """ Asynchronously fetch the comments of a received post into the response cache.
+
+        Parameters:
+         - comments_url (string): The URL of the comments of the post on its home node
+    """
+
+    fetch_executor.submit(("comments", comments_url), update_comments, comments_url)
+
+
+def update_comments(comments_url):
+    """ Makes API call to refresh the cached comments of a received post
+
+        Parameters:
+         - comments_url (string): The URL of the comments of the post on its home node
+    """
+
+    try:
+        api_requests.get(comments_url, cached=True)
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+
+    finally:
+        connection.close()
+
+
 def fetch_follow_update(actor: Author, object: Author):
     """ Asynchronously checks if actor is following object. If actor is following object, a Follow
         object is created (if does not already exist). If actor is not following object, the corresponding
@@ -130,9 +202,8 @@ def fetch_follow_update(actor: Author, object: Author):
         pass
 
 
-    # Start a thread that will update follow
-    t = threading.Thread(target=update_follow, args=[actor.id, object.id], daemon=True)
-    t.start()
+    # Queue a task that will update follow
+    fetch_executor.submit(("follow", actor.id, object.id), update_follow, actor.id, object.id)
     return actor.id, object.id
 
 
@@ -154,7 +225,7 @@ def update_follow(actor_id, object_id):
 
         # make api request to see if actor is a follower of object
         endpoint = object_url + '/followers'
-        status_code, response_body = api_requests.get(endpoint)
+        status_code, response_body = api_requests.get(endpoint, cached=True)
 
         # check if GET request came back with author object
         if status_code >= 200 and status_code <= 299 and response_body is not None:
@@ -0,0 +1,127 @@
+""" This file contains the friend graph: the followers, followees, friends and sent follow requests of an author.
+
+    The follows of an author are loaded with one query and checked in memory, so that checking the
+    relationship between the current user and every author (or commenter) on a page does not cost
+    queries per card. The result is cached in the Django cache and memoized on the author instance,
+    and is invalidated by the signal handlers on Follow and follow requests (see signals.py).
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from decouple import config
+import logging
+
+from socialDistribution.models import Follow, LocalAuthor
+
+logger = logging.getLogger(__name__)
+
+# seconds that the friend graph of an author is kept in the Django cache, 0 disables the cache
+CACHE_TTL = config("FRIEND_GRAPH_CACHE_TTL", default=300, cast=int)
+
+# incremented when any follow changes in this process, so that memoized graphs are reloaded
+_generation = 0
+
+
+class FriendGraph:
+    """ The relationships of one author. All attributes are sets of author ids. """
+
+    def __init__(self, followers, following, requested):
+        # authors who follow the author
+        self.followers = frozenset(followers)
+
+        # authors that the author follows
+        self.following = frozenset(following)
+
+        # local authors that the author has sent a follow request to
+        self.requested = frozenset(requested)
+
+        # authors who follow the author and are followed by the author
+        self.friends = self.followers & self.following
+
+    def is_following(self, author_id):
+        return author_id in self.following
+
+    def has_follower(self, author_id):
+        return author_id in self.followers
+
+    def has_friend(self, author_id):
+        return author_id in self.friends
+
+    def has_requested(self, author_id):
+        return author_id in self.requested
+
+
+def cache_key(author_id):
+    return f"friend-graph:{author_id}"
+
+
+def load(author_id):
+    """ Loads the friend graph of an author from the database. """
+
+    followers = set()
+    following = set()
+
+    # one query for the follows in both directions
+    for actor_id, object_id in Follow.objects.filter(Q(actor_id=author_id) | Q(object_id=author_id)).values_list('actor_id', 'object_id'):
+        if object_id == author_id:
+            followers.add(actor_id)
+        if actor_id == author_id:
+            following.add(object_id)
+
+    requested = LocalAuthor.follow_requests.through.objects.filter(author_id=author_id).values_list('localauthor_id', flat=True)
+    return FriendGraph(followers, following, requested)
+
+
+def get_friend_graph(author):
+    """ Gets the friend graph of an author.
+
+        Parameters:
+         - author (Author): The author (local or remote)
+
+        Returns:
+         - (FriendGraph): The relationships of the author
+    """
+
+    memoized = getattr(author, '_friend_graph', None)
+    if memoized is not None and memoized[0] == _generation:
+        return memoized[1]
+
+    generation = _generation
+    graph = None
+    if CACHE_TTL > 0:
+        try:
+            graph = cache.get(cache_key(author.id))
+        except Exception as e:
+            logger.error(e, exc_info=True)
+
+    if graph is None:
+        graph = load(author.id)
+        if CACHE_TTL > 0:
+            try:
+                cache.set(cache_key(author.id), graph, CACHE_TTL)
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    author._friend_graph = (generation, graph)
+    return graph
+
+
+def invalidate(*author_ids):
+    """ Drops the friend graphs of the given authors, now and again when the current transaction commits
+        (a graph loaded before the commit could include changes that are rolled back).
+    """
+
+    global _generation
+    _generation += 1
+
+    def delete():
+        if CACHE_TTL > 0:
+            try:
+                cache.delete_many([cache_key(author_id) for author_id in author_ids])
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    delete()
+    transaction.on_commit(delete)
@@ -0,0 +1,102 @@
+""" This file contains methods that check whether cached remote authors still exist on their home node.
+    Authors that were deleted on their home node (404 or 410) are deleted locally.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+import datetime
+import itertools
+import logging
+
+import socialDistribution.requests as api_requests
+from api.parsers import url_parser
+from socialDistribution.models import Author
+
+logger = logging.getLogger(__name__)
+
+# how often each remote author is checked
+CHECK_INTERVAL = datetime.timedelta(hours=6)
+
+# number of authors checked per sweep
+SWEEP_BATCH_SIZE = 200
+
+# number of checks that run at the same time (api_requests.host_limit bounds the checks per host)
+MAX_CHECK_WORKERS = 8
+
+
+def due_authors(limit=SWEEP_BATCH_SIZE):
+    """ Gets the remote authors that are due for a check, least recently checked first.
+        Local authors are never checked.
+    """
+
+    due_before = timezone.now() - CHECK_INTERVAL
+    return list(
+        Author.objects
+        .filter(localauthor__isnull=True)
+        .filter(Q(_last_checked__isnull=True) | Q(_last_checked__lt=due_before))
+        .order_by(F('_last_checked').asc(nulls_first=True), 'created_date')[:limit]
+    )
+
+
+def interleave_by_host(authors):
+    """ Reorders authors so that consecutive checks go to different hosts. """
+
+    by_host = {}
+    for author in authors:
+        by_host.setdefault(url_parser.get_host(author.url), []).append(author)
+
+    interleaved = itertools.zip_longest(*by_host.values())
+    return [author for group in interleaved for author in group if author is not None]
+
+
+def check_author(author):
+    """ Asks the home node of an author whether the author still exists.
+
+        A HEAD request is used so that the node does not have to send the author; nodes that
+        do not support HEAD are sent a GET instead.
+
+        Returns:
+         - (int): Status code of the response
+    """
+
+    author_url = author.url.strip("/")
+    try:
+        with api_requests.host_limit(author_url):
+            status_code = api_requests.head(author_url)
+            if status_code in [405, 501]:
+                status_code, _ = api_requests.get(author_url)
+        return status_code
+
+    finally:
+        # worker threads must close their own database connection
+        connection.close()
+
+
+def sweep(limit=SWEEP_BATCH_SIZE):
+    """ Checks one batch of due remote authors concurrently. Progress is saved in Author._last_checked,
+        so an interrupted sweep continues with the authors that were not checked yet.
+
+        Returns:
+         - (int): Number of authors checked
+         - (int): Number of authors deleted
+    """
+
+    authors = interleave_by_host(due_authors(limit))
+    if not authors:
+        return 0, 0
+
+    with ThreadPoolExecutor(max_workers=MAX_CHECK_WORKERS) as executor:
+        status_codes = list(executor.map(check_author, authors))
+
+    gone = [author.id for author, status_code in zip(authors, status_codes) if status_code in [404, 410]]
+    checked = [author.id for author, status_code in zip(authors, status_codes) if status_code not in [404, 410]]
+
+    if gone:
+        logger.info(f"Deleting {len(gone)} remote authors that no longer exist")
+        Author.objects.filter(id__in=gone).delete()
+    Author.objects.filter(id__in=checked).update(_last_checked=timezone.now())
+
+    return len(authors), len(gone)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+import logging
+import time
+
+from socialDistribution.liveness import sweep, SWEEP_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+# Django Software Foundation, "How to create custom django-admin commands", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/howto/custom-management-commands/
+class Command(BaseCommand):
+    help = "Checks whether cached remote authors still exist on their home node and deletes the ones that do not"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=60, help="Seconds to wait when no authors are due")
+        parser.add_argument('--batch', type=int, default=SWEEP_BATCH_SIZE, help="Number of authors checked per sweep")
+        parser.add_argument('--once', action='store_true', help="Run a single sweep and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            checked = 0
+            try:
+                checked, deleted = sweep(options['batch'])
+                if options['once']:
+                    self.stdout.write(f"Checked {checked} remote authors, deleted {deleted}")
+                    return
+            except Exception as e:
+                logger.error(e, exc_info=True)
+                if options['once']:
+                    raise
+
+            # keep going while there is a backlog of due authors
+            if checked < options['batch']:
+                time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+import logging
+import time
+
+from socialDistribution.dispatchers import process_outbox
+
+logger = logging.getLogger(__name__)
+
+
+# Django Software Foundation, "How to create custom django-admin commands", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/howto/custom-management-commands/
+class Command(BaseCommand):
+    help = "Delivers queued outbox activities to remote inboxes, retrying failed deliveries with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to wait between outbox passes")
+        parser.add_argument('--once', action='store_true', help="Run a single outbox pass and exit")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                delivered = process_outbox()
+                if options['once']:
+                    self.stdout.write(f"Delivered {delivered} outbox items")
+                    return
+            except Exception as e:
+                logger.error(e, exc_info=True)
+                if options['once']:
+                    raise
+
+            time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from socialDistribution.models import LocalAuthor
+from socialDistribution.timeline import rebuild_timeline
+
+
+# Django Software Foundation, "How to create custom django-admin commands", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/howto/custom-management-commands/
+class Command(BaseCommand):
+    help = "Rebuilds the home feed timelines of local authors from their posts, friends and inboxes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="Usernames of the authors to rebuild (default is all)")
+
+    def handle(self, *args, **options):
+        authors = LocalAuthor.objects.all()
+        if options['usernames']:
+            authors = authors.filter(username__in=options['usernames'])
+
+        for author in authors.iterator():
+            count = rebuild_timeline(author)
+            self.stdout.write(f"Rebuilt timeline of {author.username} ({count} posts)")
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from socialDistribution.models import LocalPost, Comment, PostLike, CommentLike
+
+
+def count_of(model, field):
+    """ Subquery that counts the rows of model whose field references the outer row. """
+
+    # Django Software Foundation, "Using aggregates within a Subquery expression", 2021-12-06
+    # https://docs.djangoproject.com/en/3.2/ref/models/expressions/#using-aggregates-within-a-subquery-expression
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(rows), 0)
+
+
+def repair(model, counters):
+    """ Recomputes counter fields of model and saves the rows whose stored counts are wrong.
+
+        Parameters:
+         - model: LocalPost or Comment
+         - counters (dict): counter field name -> subquery that counts the actual rows
+
+        Returns:
+         - (int): Number of repaired rows
+    """
+
+    actual = {f'actual_{field}': count for field, count in counters.items()}
+    wrong = Q()
+    for field in counters:
+        wrong |= ~Q(**{field: F(f'actual_{field}')})
+
+    with transaction.atomic():
+        rows = list(model.objects.select_for_update().annotate(**actual).filter(wrong).only('pk', *counters))
+        for row in rows:
+            for field in counters:
+                setattr(row, field, getattr(row, f'actual_{field}'))
+        model.objects.bulk_update(rows, list(counters), batch_size=500)
+
+    return len(rows)
+
+
+# Django Software Foundation, "How to create custom django-admin commands", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/howto/custom-management-commands/
+class Command(BaseCommand):
+    help = "Recomputes the stored like and comment counters of posts and comments"
+
+    def handle(self, *args, **options):
+        posts = repair(LocalPost, {
+            'like_count': count_of(PostLike, 'object'),
+            'comment_count': count_of(Comment, 'post'),
+        })
+        comments = repair(Comment, {
+            'like_count': count_of(CommentLike, 'object'),
+        })
+        self.stdout.write(f"Repaired counters of {posts} posts and {comments} comments")
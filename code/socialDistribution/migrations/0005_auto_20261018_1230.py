@@ -0,0 +1,37 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:30
+
+from django.db import migrations, models
+import django.utils.timezone
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0004_auto_20211201_2005'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2048)),
+                ('host', models.CharField(max_length=255)),
+                ('data', jsonfield.fields.JSONField()),
+                ('status', models.CharField(choices=[('PE', 'PENDING'), ('SE', 'SENDING'), ('DE', 'DEAD')], default='PE', max_length=2)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_status_code', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_date', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_date', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxitem',
+            index=models.Index(fields=['host', 'status', 'created_date'], name='outbox_host_status_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0005_auto_20261018_1230'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxpost',
+            name='_last_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='localpost',
+            name='_last_updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
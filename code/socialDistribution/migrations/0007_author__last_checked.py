@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0006_auto_20261018_1233'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='_last_checked',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
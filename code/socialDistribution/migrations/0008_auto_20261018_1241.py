@@ -0,0 +1,43 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0007_author__last_checked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('published', models.DateTimeField()),
+                ('inbox_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='socialDistribution.inboxpost')),
+                ('local_post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='socialDistribution.localpost')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='socialDistribution.localauthor')),
+            ],
+            options={
+                'ordering': ['-published', '-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-published'], name='timeline_owner_published_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('inbox_post__isnull', True), ('local_post__isnull', False)), models.Q(('inbox_post__isnull', False), ('local_post__isnull', True)), _connector='OR'), name='timeline_entry_one_post'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('owner', 'local_post'), name='unique_timeline_local_post'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('owner', 'inbox_post'), name='unique_timeline_inbox_post'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing(apps, schema_editor):
+    LocalPost = apps.get_model('socialDistribution', 'LocalPost')
+    Comment = apps.get_model('socialDistribution', 'Comment')
+
+    for post in LocalPost.objects.annotate(likes_count=Count('likes', distinct=True), comments_count=Count('comment', distinct=True)):
+        LocalPost.objects.filter(pk=post.pk).update(like_count=post.likes_count, comment_count=post.comments_count)
+
+    for comment in Comment.objects.annotate(likes_count=Count('likes')):
+        Comment.objects.filter(pk=comment.pk).update(like_count=comment.likes_count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0008_auto_20261018_1241'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='localpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='localpost',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0009_auto_20261018_1245'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='url',
+            field=models.URLField(db_index=True, max_length=2048),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-pub_date'], name='comment_post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inboxpost',
+            index=models.Index(fields=['author', '-published'], name='inboxpost_author_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='localpost',
+            index=models.Index(fields=['visibility', 'unlisted', '-published'], name='localpost_visibility_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='localpost',
+            index=models.Index(fields=['author', '-published'], name='localpost_author_pub_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:50
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_inbox_posts(apps, schema_editor):
+    """ Keeps the most recently updated InboxPost of each public_id, moving the inbox memberships and
+        timeline entries of the duplicates to it, so that public_id can be made unique.
+    """
+    InboxPost = apps.get_model('socialDistribution', 'InboxPost')
+    TimelineEntry = apps.get_model('socialDistribution', 'TimelineEntry')
+    InboxMembership = apps.get_model('socialDistribution', 'LocalAuthor').inbox_posts.through
+
+    duplicated = InboxPost.objects.values('public_id').annotate(n=Count('id')).filter(n__gt=1).values_list('public_id', flat=True)
+    for public_id in list(duplicated):
+        keeper, *duplicates = InboxPost.objects.filter(public_id=public_id).order_by('-_last_updated')
+        duplicate_ids = [post.id for post in duplicates]
+
+        for membership in InboxMembership.objects.filter(inboxpost_id__in=duplicate_ids):
+            InboxMembership.objects.get_or_create(localauthor_id=membership.localauthor_id, inboxpost_id=keeper.id)
+
+        for entry in TimelineEntry.objects.filter(inbox_post_id__in=duplicate_ids):
+            if not TimelineEntry.objects.filter(owner_id=entry.owner_id, inbox_post_id=keeper.id).exists():
+                TimelineEntry.objects.create(owner_id=entry.owner_id, inbox_post_id=keeper.id, published=keeper.published)
+
+        InboxPost.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    # the rows are merged in their own migration (and transaction), before the unique constraint is added
+    # in the next one: PostgreSQL cannot alter a table with pending trigger events in the same transaction
+    dependencies = [
+        ('socialDistribution', '0010_auto_20261018_1250'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_inbox_posts, migrations.RunPython.noop),
+    ]
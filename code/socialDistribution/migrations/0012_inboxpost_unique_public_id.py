@@ -0,0 +1,17 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0011_merge_duplicate_inbox_posts'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='inboxpost',
+            constraint=models.UniqueConstraint(fields=('public_id',), name='unique_inbox_post_public_id'),
+        ),
+    ]
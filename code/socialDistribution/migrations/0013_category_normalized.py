@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0012_inboxpost_unique_public_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='normalized',
+            field=models.CharField(max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def normalize_categories(apps, schema_editor):
+    """ Fills the normalized name of every category, merging categories whose names only differ in
+        case into the oldest one so that the normalized name can be made unique.
+    """
+    Category = apps.get_model('socialDistribution', 'Category')
+    LocalPost = apps.get_model('socialDistribution', 'LocalPost')
+    InboxPost = apps.get_model('socialDistribution', 'InboxPost')
+    throughs = [LocalPost.categories.through, InboxPost.categories.through]
+
+    keepers = {}
+    for category in Category.objects.order_by('id'):
+        key = category.category.strip().lower()
+        keeper = keepers.get(key)
+        if keeper is None:
+            category.normalized = key
+            category.save(update_fields=['normalized'])
+            keepers[key] = category
+            continue
+
+        # move the posts of the duplicate to the category that is kept
+        for through in throughs:
+            post_field = [field.name for field in through._meta.fields if field.name.endswith('post')][0]
+            tagged = through.objects.filter(category_id=category.id)
+            already = set(through.objects.filter(category_id=keeper.id).values_list(f'{post_field}_id', flat=True))
+            through.objects.bulk_create([
+                through(**{f'{post_field}_id': post_id, 'category_id': keeper.id})
+                for post_id in tagged.values_list(f'{post_field}_id', flat=True) if post_id not in already
+            ])
+            tagged.delete()
+        category.delete()
+
+
+class Migration(migrations.Migration):
+
+    # the categories are merged in their own migration (and transaction), before the normalized name is
+    # made unique in the next one: PostgreSQL cannot alter a table with pending trigger events
+    dependencies = [
+        ('socialDistribution', '0013_category_normalized'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_categories, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0014_normalize_categories'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='normalized',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:53
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def link_cached_authors(apps, schema_editor):
+    """ Links the received posts to the cached Author with the same URL, in a single UPDATE. """
+    InboxPost = apps.get_model('socialDistribution', 'InboxPost')
+    Author = apps.get_model('socialDistribution', 'Author')
+
+    InboxPost.objects.update(
+        cached_author=Subquery(Author.objects.filter(url=OuterRef('author')).values('id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0015_alter_category_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxpost',
+            name='cached_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_posts', to='socialDistribution.author'),
+        ),
+        migrations.RunPython(link_cached_authors, migrations.RunPython.noop),
+    ]
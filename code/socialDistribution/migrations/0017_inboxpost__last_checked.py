@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0016_inboxpost_cached_author'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inboxpost',
+            name='_last_checked',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0017_inboxpost__last_checked'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='inboxpost',
+            name='visibility',
+            field=models.CharField(choices=[('PB', 'PUBLIC'), ('FR', 'FRIENDS'), ('PR', 'PRIVATE')], default='PB', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='localpost',
+            name='visibility',
+            field=models.CharField(choices=[('PB', 'PUBLIC'), ('FR', 'FRIENDS'), ('PR', 'PRIVATE')], default='PB', max_length=255),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialDistribution', '0018_alter_post_visibility'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxitem',
+            name='outbox_host_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='outboxitem',
+            index=models.Index(fields=['url', 'status', 'created_date'], name='outbox_url_status_idx'),
+        ),
+    ]
@@ -9,3 +9,5 @@ from .category import Category
 from .comment import Comment
 from .like import PostLike, CommentLike
 from .follow import Follow
+from .outbox import OutboxItem
+from .timeline import TimelineEntry
@@ -23,7 +23,7 @@ class Author(models.Model):
 
     # Django Software Foundation, https://docs.djangoproject.com/en/dev/ref/models/fields/#uuidfield
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    url = models.URLField(max_length=URL_MAXLEN)
+    url = models.URLField(max_length=URL_MAXLEN, db_index=True)
     host = models.URLField(max_length=STRING_MAXLEN, blank=True)
     displayName = models.CharField(max_length=STRING_MAXLEN, default="Anonymous User")
     githubUrl = models.CharField(max_length=URL_MAXLEN, null=True)
@@ -34,6 +34,10 @@ class Author(models.Model):
     # will need later for caching
     _last_updated = models.DateTimeField(auto_now=True)
 
+    # timestamp of when the remote node was last asked whether the author still exists
+    # (see liveness.py), null if never checked
+    _last_checked = models.DateTimeField(null=True, blank=True)
+
     # true means that field data will always be up-to-date (used by LocalAuthor)
     _always_up_to_date = models.BooleanField(default=False)
 
@@ -127,28 +131,27 @@ class LocalAuthor(Author):
     follow_requests = models.ManyToManyField('Author', related_name="sent_follow_requests")
     inbox_posts = models.ManyToManyField('InboxPost')
 
+    def get_friend_graph(self):
+        """ Gets the followers, followees and friends of self (see friend_graph.py). """
+
+        # imported here to avoid a circular import
+        from socialDistribution.friend_graph import get_friend_graph
+        return get_friend_graph(self)
+
     def is_following(self, author: Author):
         """ Returns true if self is following author, false otherwise. """
 
-        try:
-            self.following.get(object=author)
-            return True
-        except Follow.DoesNotExist:
-            return False
+        return self.get_friend_graph().is_following(author.id)
 
     def has_follower(self, author: Author):
         """ Returns true if author is a follower of self, false otherwise. """
 
-        try:
-            self.follows.get(actor=author)
-            return True
-        except Follow.DoesNotExist:
-            return False
+        return self.get_friend_graph().has_follower(author.id)
 
     def has_friend(self, author: Author):
         """ Returns true if author is a friend of self, false otherwise. """
 
-        return Follow.are_friends(self, author)
+        return self.get_friend_graph().has_friend(author.id)
 
     def has_follow_request(self, author: Author):
         """ Returns true if self has a follow request from author, false otherwise. """
@@ -170,16 +173,14 @@ class LocalAuthor(Author):
     def get_followers(self):
         """ Gets the Authors who are followers of self. """
 
-        follows = self.follows.all()
+        follows = self.follows.select_related('actor')
         followers = [f.actor for f in follows]
         return followers
 
     def get_friends(self):
         """ Gets the Authors who are friends of self. """
 
-        follows = self.follows.all()
-        friends = [f.actor for f in follows if self.has_friend(f.actor)]
-        return friends
+        return list(Author.objects.filter(id__in=self.get_friend_graph().friends))
 
     def __str__(self):
         return self.displayName
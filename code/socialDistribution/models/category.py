@@ -5,6 +5,52 @@ class Category(models.Model):
     Categories model:
         id                  Auto-generated id
         category            Category name
+        normalized          Lowercase category name, unique (category names are case-insensitive)
         posts                reference to post (Many-to-Many relationship)
     '''
     category = models.CharField(max_length=STRING_MAXLEN)
+    normalized = models.CharField(max_length=STRING_MAXLEN, unique=True)
+
+    @staticmethod
+    def normalize(name):
+        """ Gets the key that identifies a category name, ignoring case and surrounding whitespace. """
+        return name.strip().lower()
+
+    def save(self, *args, **kwargs):
+        self.normalized = Category.normalize(self.category)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def resolve(cls, names):
+        """ Gets the categories with the given names, creating the missing ones.
+
+            All names are looked up with one query against the normalized column, and the
+            missing categories are created with one bulk insert. Empty names are skipped.
+
+            Parameters:
+             - names (list): Category names, compared case-insensitively
+
+            Returns:
+             - (list): Categories in the order of their first name, without duplicates
+        """
+
+        # the first spelling of a name is used when the category is created
+        wanted = {}
+        for name in names:
+            key = cls.normalize(name)
+            if key and key not in wanted:
+                wanted[key] = name.strip()
+
+        if not wanted:
+            return []
+
+        found = {category.normalized: category for category in cls.objects.filter(normalized__in=wanted)}
+        missing = [cls(category=name, normalized=key) for key, name in wanted.items() if key not in found]
+        if missing:
+            # another request may create the same categories concurrently,
+            # and bulk_create does not return ids on every database
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            created = cls.objects.filter(normalized__in=[category.normalized for category in missing])
+            found.update({category.normalized: category for category in created})
+
+        return [found[key] for key in wanted]
@@ -15,8 +15,15 @@ class Comment(models.Model):
         pub_date            Published date (datetime)
         post                Post related to the comment (reference to post)
         likes               Likes created by Authors that liked this comment
+        like_count          Number of likes (maintained by signals.py)
     '''
 
+    class Meta:
+        indexes = [
+            # comments of a post, newest first
+            models.Index(fields=['post', '-pub_date'], name='comment_post_pub_date_idx'),
+        ]
+
     class CommentContentType(models.TextChoices):
         PLAIN = 'PL', 'text/plain'
         MARKDOWN = 'MD', 'text/markdown'
@@ -35,6 +42,8 @@ class Comment(models.Model):
     post = models.ForeignKey('LocalPost', on_delete=models.CASCADE)
     pub_date = models.DateTimeField()
 
+    like_count = models.PositiveIntegerField(default=0)
+
     def when(self):
         '''
         Returns string describing when the comment was created
@@ -56,4 +65,4 @@ class Comment(models.Model):
         '''
             Returns total likes
         '''
-        return self.likes.count()
\ No newline at end of file
+        return self.like_count
\ No newline at end of file
@@ -32,6 +32,15 @@ class Follow(models.Model):
         second = cls.objects.filter(actor_id=author2.id, object_id=author1.id).exists()
         return first and second
 
+    @classmethod
+    def friend_ids(cls, author):
+        """ Gets a query of the ids of the friends of author (authors that follow author and are followed
+            by author). The query can be used as a subquery, so that it runs in the same SQL query.
+        """
+
+        followed = cls.objects.filter(actor_id=author.id).values('object_id')
+        return cls.objects.filter(object_id=author.id, actor_id__in=followed).values('actor_id')
+
     def up_to_date(self):
         """ Checks if the follow data is currently up do date. Returns true if either the 
             data is always maintained up-to-date or if the data was recently refreshed
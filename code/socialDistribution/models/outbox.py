@@ -0,0 +1,96 @@
+from django.db import models
+from django.utils import timezone
+
+from jsonfield import JSONField
+import datetime
+
+from api.parsers import url_parser
+from cmput404.constants import STRING_MAXLEN, URL_MAXLEN
+
+
+class OutboxItem(models.Model):
+    '''
+    OutboxItem model:
+        id                  Auto-generated id
+        url                 Inbox (or other endpoint) URL that data is POSTed to, items for the same
+                            url are delivered in order
+        host                Host of url
+        data                JSON body of the activity (post, follow, like or comment)
+        status              PENDING, SENDING or DEAD (delivered items are deleted)
+        attempts            Number of failed delivery attempts
+        next_attempt        Earliest time at which the next delivery attempt may happen
+        claimed_at          When a worker started the current delivery attempt
+        last_status_code    Status code of the last failed attempt
+        created_date        When the item was enqueued
+    '''
+
+    class Status(models.TextChoices):
+        PENDING = "PE", "PENDING"
+        SENDING = "SE", "SENDING"
+        DEAD = "DE", "DEAD"
+
+    # failed deliveries are retried after BACKOFF_BASE, 2 * BACKOFF_BASE, 4 * BACKOFF_BASE, ... up to BACKOFF_MAX
+    BACKOFF_BASE = datetime.timedelta(seconds=30)
+    BACKOFF_MAX = datetime.timedelta(hours=1)
+
+    # items are dead-lettered after this many failed attempts
+    MAX_ATTEMPTS = 8
+
+    # a SENDING item whose worker has not reported back after this long is assumed lost
+    CLAIM_TIMEOUT = datetime.timedelta(minutes=2)
+
+    url = models.URLField(max_length=URL_MAXLEN)
+    host = models.CharField(max_length=STRING_MAXLEN)
+    data = JSONField()
+    status = models.CharField(max_length=2, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_status_code = models.PositiveIntegerField(null=True, blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_date', 'id']
+        indexes = [
+            models.Index(fields=['url', 'status', 'created_date'], name='outbox_url_status_idx'),
+        ]
+
+    @classmethod
+    def enqueue(cls, url, data):
+        """ Adds an activity to the outbox. """
+
+        return cls.objects.create(url=url, host=url_parser.get_host(url), data=data)
+
+    def is_claim_expired(self):
+        """ Checks if the worker that claimed this item has not reported back in time. """
+
+        return self.claimed_at is None or self.claimed_at < timezone.now() - self.CLAIM_TIMEOUT
+
+    def is_due(self):
+        """ Checks if a delivery attempt can be made now. """
+
+        return self.next_attempt <= timezone.now()
+
+    def record_failure(self, status_code):
+        """ Schedules the next attempt with exponential backoff, or dead-letters the item if
+            the failure is permanent or it failed too many times.
+        """
+
+        self.attempts += 1
+        self.last_status_code = status_code
+        self.claimed_at = None
+
+        # client errors will not go away by retrying (except timeouts and rate limits)
+        is_permanent = 400 <= status_code < 500 and status_code not in [408, 429]
+
+        if is_permanent or self.attempts >= self.MAX_ATTEMPTS:
+            self.status = self.Status.DEAD
+        else:
+            self.status = self.Status.PENDING
+            backoff = min(self.BACKOFF_BASE * (2 ** (self.attempts - 1)), self.BACKOFF_MAX)
+            self.next_attempt = timezone.now() + backoff
+
+        self.save()
+
+    def __str__(self):
+        return f"{self.get_status_display()}: {self.url} ({self.attempts} attempts)"
@@ -1,5 +1,5 @@
 from django.db import models
-from django.db.models import Q
+from django.db.models import OuterRef, Prefetch, Q, Subquery, prefetch_related_objects
 from django.utils import timezone
 
 from jsonfield import JSONField
@@ -11,6 +11,8 @@ import socialDistribution.requests as api_requests
 from cmput404.constants import STRING_MAXLEN, URL_MAXLEN, API_BASE, CLIENT_BASE
 from api.json_validators import validate_post_json
 from .category import Category
+from .comment import Comment
+from .follow import Follow
 
 
 class PostQuerySet(models.QuerySet):
@@ -43,6 +45,28 @@ class PostQuerySet(models.QuerySet):
         """ Order results in chronological order in terms of published date."""
         return self.order_by('-published')[:]
 
+    def feed_for(self, author, limit=None):
+        """ Get the listed posts that belong in the feed of author, newest first: public posts,
+            posts by author, and friends posts of friends of author. Only used on LocalPost.
+
+            Friends are found with a subquery, so the feed is a single SQL query no matter how many
+            friends author has. Each branch of the filter is found with an index (visibility or author),
+            but their union is not in published order, so the matching posts are sorted without an
+            index before the limit is applied.
+
+            Parameters:
+             - author (Author): The author whose feed is built
+             - limit (int): Maximum number of posts (default is None, no limit)
+        """
+
+        posts = self.listed().filter(
+            Q(visibility=Post.Visibility.PUBLIC) |
+            Q(author_id=author.id) |
+            Q(visibility=Post.Visibility.FRIENDS, author_id__in=Follow.friend_ids(author))
+        ).order_by('-published')
+
+        return posts[:limit] if limit else posts
+
 
 class Post(models.Model):
 
@@ -127,6 +151,9 @@ class Post(models.Model):
         default=False
     )
 
+    # timestamp of when the object was last updated
+    _last_updated = models.DateTimeField(auto_now=True)
+
     @property
     def author_as_json(self):
         """ Gets the author of the post in JSON format. """
@@ -150,6 +177,13 @@ class Post(models.Model):
 
         return bytes(self.content).decode('utf-8')
 
+    def set_categories(self, names):
+        """ Sets the categories of the post to the given names (case-insensitive), creating the
+            missing categories. Only the categories that changed are added or removed.
+        """
+
+        self.categories.set(Category.resolve(names))
+
     def is_image_post(self):
         """ Check if the post is an image-only post """
         return self.content_type in [
@@ -219,24 +253,52 @@ class LocalPost(Post):
         visibility          PUBLIC or FRIENDS
         unlisted            Boolean indicating whether post is listed or not
         likes               Likes created by Authors that liked this post
+        like_count          Number of likes (maintained by signals.py)
+        comment_count       Number of comments (maintained by signals.py)
 
     '''
 
+    class Meta:
+        # Django Software Foundation, "Model index reference", 2021-12-06
+        # https://docs.djangoproject.com/en/3.2/ref/models/indexes/
+        indexes = [
+            # public feeds and visibility filters, newest first
+            models.Index(fields=['visibility', 'unlisted', '-published'], name='localpost_visibility_pub_idx'),
+            # posts of an author, newest first
+            models.Index(fields=['author', '-published'], name='localpost_author_pub_idx'),
+        ]
+
+    # counters are only changed with F() updates when likes and comments are created or deleted
+    # (see signals.py), and can be recomputed with the repair_counters command
+    COUNTER_FIELDS = ['like_count', 'comment_count']
+
     # reference to LocalAuthor that created this post
     author = models.ForeignKey('LocalAuthor', on_delete=models.CASCADE, related_name="posts")
 
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
     @property
     def author_as_json(self):
         """ Gets the author of the post in JSON format. """
 
         return self.author.as_json()
 
+    # number of comments sent in commentsSrc
+    RECENT_COMMENTS = 5
+
     @property
     def recent_comments_json(self):
         """ Gets the comments of the post in JSON format. """
 
         author_id = self.author.id
-        recent_comments = [comment.as_json() for comment in self.comments()[:5]]
+
+        # use the comments loaded by bulk_as_json if there are any
+        recent_comments = getattr(self, '_recent_comments', None)
+        if recent_comments is None:
+            recent_comments = self.comments().select_related('author')[:self.RECENT_COMMENTS]
+
+        recent_comments = [comment.as_json() for comment in recent_comments]
         return {
             "type": "comments",
             "page": 1,
@@ -255,15 +317,59 @@ class LocalPost(Post):
 
     def comments(self):
         """ Gets the comments of the post """
-        return self.comment_set.order_by('-pub_date')
+        return self.comment_set.order_by('-pub_date', '-id')
 
     def total_likes(self):
         """ Gets the total number of likes on the post. """
 
-        return self.likes.count()
+        return self.like_count
+
+    def save(self, *args, **kwargs):
+        if self.pk is None:
+            # a new copy of a post (see share_post) has no likes or comments yet
+            self.like_count = 0
+            self.comment_count = 0
+
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            # don't overwrite counters that changed since the post was loaded
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+
+        super().save(*args, **kwargs)
 
     def get_id(self):
         return f"{API_BASE}/author/{self.author.id}/posts/{self.id}"
+
+    @classmethod
+    def bulk_as_json(cls, posts):
+        """ Gets the JSON representation of each post, like as_json, in a fixed number of queries
+            no matter how many posts there are: one each for the authors, the categories and the
+            recent comments (with their authors) of all posts.
+
+            Parameters:
+             - posts (list or QuerySet of LocalPost): The posts to serialize
+        """
+
+        posts = list(posts)
+
+        # the RECENT_COMMENTS newest comments of each post
+        # Django Software Foundation, "Prefetch() objects", 2021-12-06
+        # https://docs.djangoproject.com/en/3.2/ref/models/querysets/#prefetch-objects
+        newest = Comment.objects.filter(post_id=OuterRef('post_id')).order_by('-pub_date', '-id').values('id')
+        recent_comments = Comment.objects \
+            .filter(id__in=Subquery(newest[:cls.RECENT_COMMENTS])) \
+            .select_related('author') \
+            .order_by('-pub_date', '-id')
+
+        prefetch_related_objects(
+            posts,
+            'author',
+            'categories',
+            Prefetch('comment_set', queryset=recent_comments, to_attr='_recent_comments')
+        )
+        return [post.as_json() for post in posts]
     
     def get_local_shareable_link(self):
         return f"{CLIENT_BASE}/public-share/{self.id}"
@@ -300,7 +406,7 @@ class LocalPost(Post):
             # comments about the post
             # return a maximum number of comments
             # total number of comments for this post
-            "count": 0,
+            "count": self.comment_count,
             # the first page of comments
             "comments": f"{API_BASE}/author/{self.author.id}/posts/{self.id}/comments/",
             # commentsSrc is OPTIONAL and can be missing
@@ -337,21 +443,50 @@ class InboxPost(Post):
 
         content             Content of the post
         categories          Categories encoded as a JSON array
-        author              Author of the post
+        author              Author of the post (a URL)
+        cached_author       Locally cached Author of the post (reference to Author, set when received)
         count               Total number of comments (small integer)
         published           Post published date (datetime)
         visibility          PUBLIC or FRIENDS
         unlisted            Boolean indicating whether post is listed or not
+        _last_checked       When the post was last checked for edits and deletes on its home node
 
     '''
 
+    class Meta:
+        indexes = [
+            # posts received from an author, newest first
+            models.Index(fields=['author', '-published'], name='inboxpost_author_pub_idx'),
+        ]
+        constraints = [
+            # a post is only stored once, no matter how many inboxes it was sent to
+            models.UniqueConstraint(fields=['public_id'], name='unique_inbox_post_public_id'),
+        ]
+
     author = models.URLField(max_length=URL_MAXLEN)
 
+    # the cached Author row of author, so that post authors can be loaded with a join
+    cached_author = models.ForeignKey(
+        'Author',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='received_posts'
+    )
+
     _author_json = JSONField()
 
+    # null means never checked (see fetch_update and fetchers.fetch_post_updates)
+    _last_checked = models.DateTimeField(null=True, blank=True)
+
     @property
     def author_as_json(self):
-        """ Gets the author of the post in JSON format. """
+        """ Gets the author of the post in JSON format, without any remote requests. The cached Author
+            is used when the post is linked to one (it is refreshed in the background, see
+            fetchers.fetch_post_author_updates), otherwise the author as it was received.
+        """
+        if self.cached_author_id is not None:
+            return self.cached_author.as_json()
         return self._author_json
 
 
@@ -366,8 +501,11 @@ class InboxPost(Post):
             object_url = self.public_id.split('/')[-1]
             endpoint = actor_url + '/posts/' + object_url
 
-            status_code, response_body = api_requests.get(endpoint)
+            # the post is checked because it may have changed, so a cached copy is not used
+            with api_requests.host_limit(endpoint):
+                status_code, response_body = api_requests.get(endpoint, cached=False)
             response_body = validate_post_json(response_body) if response_body is not None else None
+            self._last_checked = timezone.now()
 
             # check if GET request came back with post object
             if status_code == 200 and response_body is not None:
@@ -392,69 +530,88 @@ class InboxPost(Post):
                 categories = response_body['categories']
 
                 if categories is not None:
-                    categories_to_remove = [cat.category for cat in self.categories.all()]
-
-                    """
-                    This implementation makes category names case-insensitive.
-                    This makes handling Category objects cleaner, albeit slightly more
-                    involved.
-                    """
-                    for category in categories:
-                        category_obj, created = Category.objects.get_or_create(
-                            category__iexact=category,
-                            defaults={'category': category}
-                        )
-                        self.categories.add(category_obj)
-
-                        while category_obj.category in categories_to_remove:
-                            categories_to_remove.remove(category_obj.category)     # don't remove this category
-
-                    for category in categories_to_remove:
-                        category_obj = Category.objects.get(category=category)
-                        self.categories.remove(category_obj)
+                    self.set_categories(categories)
 
                 self.save()
             elif status_code == 400 or status_code == 404 or status_code == 410:
                 self.delete()
+            else:
+                # only record the check
+                InboxPost.objects.filter(id=self.id).update(_last_checked=self._last_checked)
         except Exception as e:
             print(f'Error updating post: {self.title}')
             print(e)
 
-    @property
-    def comments_as_json(self):
-        request_url = self.public_id.strip('/') + '/comments'
-        status_code, response_data = api_requests.get(request_url)
-        if status_code == 200 and response_data is not None:
-            if "comments" in response_data:
-                comments = response_data["comments"]
-            elif "items" in response_data:
-                # group 11 sends "items" instead 
-                comments = response_data["items"]
-            else:
-                comments = []
+    @classmethod
+    def bulk_as_json(cls, posts):
+        """ Gets the JSON representation of each post, like as_json, loading the categories of all
+            posts in one query.
 
-            # check if a list 
-            if not type(comments) == list:
-                return []
-            else:
-                return comments
+            Parameters:
+             - posts (list or QuerySet of InboxPost): The posts to serialize
+        """
+
+        posts = list(posts)
+        prefetch_related_objects(posts, 'categories', 'cached_author')
+        return [post.as_json() for post in posts]
+
+    def get_comments_url(self):
+        """ Gets the URL of the comments of the post on its home node. """
+        return self.public_id.strip('/') + '/comments'
+
+    @staticmethod
+    def parse_comments(response_data):
+        """ Gets the list of comments from a comments response of a remote node. """
+
+        if "comments" in response_data:
+            comments = response_data["comments"]
+        elif "items" in response_data:
+            # group 11 sends "items" instead 
+            comments = response_data["items"]
         else:
+            comments = []
+
+        # check if a list 
+        if not type(comments) == list:
             return []
-        
+        else:
+            return comments
+
     @property
-    def author_as_json(self):
-        request_url = self.public_id.strip('/')
-        status_code, response_data = api_requests.get(request_url)
+    def comments_as_json(self):
+        """ Gets the comments of the post from its home node (through the response cache). """
+
+        status_code, response_data = api_requests.get(self.get_comments_url(), cached=True)
         if status_code == 200 and response_data is not None:
-            author = response_data["author"]
-            return author
+            return self.parse_comments(response_data)
         else:
+            return []
+
+    @property
+    def cached_comments_as_json(self):
+        """ Gets the comments of the post from the response cache only, without waiting for its home node.
+            Missing or stale comments are fetched in the background for the next call.
+
+            Returns:
+             - (list): The comments, or None if they are not cached
+        """
+
+        # imported here, fetchers imports the models
+        from socialDistribution.fetchers import fetch_comments_update
+
+        request_url = self.get_comments_url()
+        response_data, is_fresh = api_requests.get_cached(request_url)
+        if not is_fresh:
+            fetch_comments_update(request_url)
+
+        if response_data is None:
             return None
+        return self.parse_comments(response_data)
 
     def as_json(self):
         previousCategories = self.categories.all()
         previousCategoriesNames = [cat.category for cat in previousCategories]
-        return {
+        json_data = {
             "type": "post",
             # title of a post
             "title": self.title,
@@ -486,11 +643,6 @@ class InboxPost(Post):
             "count": 0,
             # the first page of comments
             "comments": f"{self.public_id}/comments",
-            # commentsSrc is OPTIONAL and can be missing
-            # You should return ~ 5 comments per post.
-            # should be sorted newest(first) to oldest(last)
-            # this is to reduce API call counts
-            "commentsSrc": self.comments_as_json,
             # ISO 8601 TIMESTAMP
             "published": self.published.isoformat(),
             # visibility ["PUBLIC","FRIENDS"]
@@ -500,4 +652,12 @@ class InboxPost(Post):
             # FRIENDS should've already been sent the post so they don't need this
             "unlisted": self.unlisted
             # unlisted means it is public if you know the post name -- use this for images, it's so images don't show up in timelines
-        }
\ No newline at end of file
+        }
+
+        # commentsSrc is OPTIONAL and can be missing
+        # it is only served from the response cache, so that serving a received post never waits for its home node
+        comments = self.cached_comments_as_json
+        if comments is not None:
+            json_data["commentsSrc"] = comments
+
+        return json_data
\ No newline at end of file
@@ -0,0 +1,43 @@
+from django.db import models
+from django.db.models import Q
+
+
+class TimelineEntry(models.Model):
+    '''
+    TimelineEntry model:
+        id                  Auto-generated id
+        owner               LocalAuthor whose home feed shows the post
+        local_post          Post shown, if it is a LocalPost
+        inbox_post          Post shown, if it is an InboxPost
+        published           Published date of the post (copied so the feed is one index range scan)
+
+    Entries are written when posts are created, edited, deleted or received (see timeline.py).
+    '''
+
+    owner = models.ForeignKey('LocalAuthor', on_delete=models.CASCADE, related_name="timeline")
+    local_post = models.ForeignKey('LocalPost', on_delete=models.CASCADE, null=True, blank=True)
+    inbox_post = models.ForeignKey('InboxPost', on_delete=models.CASCADE, null=True, blank=True)
+    published = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-published', '-id']
+        indexes = [
+            models.Index(fields=['owner', '-published'], name='timeline_owner_published_idx'),
+        ]
+        constraints = [
+            # an entry is for exactly one post
+            models.CheckConstraint(
+                check=Q(local_post__isnull=False, inbox_post__isnull=True) | Q(local_post__isnull=True, inbox_post__isnull=False),
+                name='timeline_entry_one_post'
+            ),
+            models.UniqueConstraint(fields=['owner', 'local_post'], name='unique_timeline_local_post'),
+            models.UniqueConstraint(fields=['owner', 'inbox_post'], name='unique_timeline_inbox_post'),
+        ]
+
+    @property
+    def post(self):
+        """ Gets the post of the entry. """
+        return self.local_post or self.inbox_post
+
+    def __str__(self):
+        return f"{self.owner}: {self.post}"
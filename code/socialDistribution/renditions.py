@@ -0,0 +1,141 @@
+""" This file contains the rendition cache: image posts converted to another format (e.g. webp for the
+    markdown parser), stored on local disk so that each version of an image is only converted once.
+
+    A rendition is keyed by the post id, the content version of the post (when it was last updated)
+    and the format. Editing a post changes its key, so old renditions are never served; they are
+    evicted, least recently used first, when the cache grows over RENDITION_CACHE_MAX_BYTES.
+"""
+
+from decouple import config
+from PIL import Image
+from io import BytesIO
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# directory that the renditions are stored in
+RENDITION_CACHE_LOCATION = config(
+    "RENDITION_CACHE_LOCATION",
+    default=os.path.join(tempfile.gettempdir(), 'cmput404_renditions')
+)
+
+# upper bound on the total size of the stored renditions, in bytes
+RENDITION_CACHE_MAX_BYTES = config("RENDITION_CACHE_MAX_BYTES", default=100 * 1024 * 1024, cast=int)
+
+# seconds that browsers may use a rendition without revalidating it; an edit of the post shows up in
+# browsers that have the old version after at most this long
+RENDITION_MAX_AGE = config("RENDITION_MAX_AGE", default=300, cast=int)
+
+# number of locks that the rendition keys are spread over
+LOCK_STRIPES = 64
+
+# concurrent requests for the same rendition share a lock, so that the image is converted once;
+# the set of locks is fixed, so a lock is never replaced while a request is holding or waiting on it
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def rendition_key(post, format):
+    """ Gets the key of the rendition of a post image in the given format (e.g. 'webp'). """
+
+    version = f"{post.id}:{post._last_updated.isoformat()}:{format.lower()}"
+    return hashlib.sha256(version.encode('utf-8')).hexdigest()
+
+
+def rendition_etag(post, format):
+    """ Gets the (strong) ETag of the rendition of a post image. """
+    return f'"{rendition_key(post, format)}"'
+
+
+def get_lock(key):
+    """ Gets the lock of a rendition key (a hex digest, see rendition_key). """
+    return _locks[int(key, 16) % LOCK_STRIPES]
+
+
+def convert(post, format):
+    """ Converts the image of an image post to the given format. Returns the encoded bytes. """
+
+    image_binary = base64.b64decode(post.decoded_content)
+    img = Image.open(BytesIO(image_binary))
+    converted = BytesIO()
+    img.save(converted, format)
+    return converted.getvalue()
+
+
+def open_rendition(post, format):
+    """ Opens the rendition of a post image in the given format, converting the image if this
+        version of it was not converted yet. The file is opened before any eviction, so it can be
+        streamed even if it is evicted meanwhile; a rendition that is evicted before it is opened
+        is converted again.
+
+        Parameters:
+         - post (LocalPost): An image post
+         - format (string): A format supported by PIL (e.g. 'webp')
+
+        Returns:
+         - (file): The rendition, opened for reading in binary mode (a BytesIO if it was just converted)
+    """
+
+    key = rendition_key(post, format)
+    path = os.path.join(RENDITION_CACHE_LOCATION, key)
+
+    with get_lock(key):
+        try:
+            rendition = open(path, 'rb')
+        except FileNotFoundError:
+            # not converted yet, or evicted (possibly by another process)
+            pass
+        else:
+            try:
+                # mark the rendition as recently used
+                os.utime(path)
+            except OSError:
+                # evicted since it was opened, it can still be read
+                pass
+            return rendition
+
+        data = convert(post, format)
+
+        # write to a temporary file first, so that a rendition is never read before it is complete
+        os.makedirs(RENDITION_CACHE_LOCATION, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RENDITION_CACHE_LOCATION, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    evict()
+
+    # serve the converted bytes, the file may be evicted by another process before it is opened
+    return BytesIO(data)
+
+
+def evict(max_bytes=None):
+    """ Removes the least recently used renditions until the cache is at most max_bytes
+        (default is RENDITION_CACHE_MAX_BYTES) in size.
+    """
+
+    max_bytes = RENDITION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    try:
+        entries = []
+        with os.scandir(RENDITION_CACHE_LOCATION) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+    except FileNotFoundError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError as e:
+            logger.warning(f"Could not remove rendition {path}: {e}")
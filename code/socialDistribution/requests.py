@@ -1,18 +1,51 @@
 """ File that contains wrapper methods for all API HTTP requests. Use this file for making GET, POST, PUT,
     DELETE, etc requests to any social distribution API server. Functions in this file just act as a wrapper for
-    adding appropriate headers and parsing the response as JSON.
+    adding appropriate headers and parsing the response as JSON. Requests are sent over pooled keep-alive
+    connections, one pool per remote host. Requests to a host whose circuit is open (see CircuitBreaker)
+    are not sent and return a 503 status code right away. GET responses can be cached (see get).
 """
 
 import requests
 import json
 import logging
 import base64
+import copy
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from decouple import config
 
 from api.node_manager import node_manager
 from api.parsers import url_parser
 
 TIMEOUT = 5
 
+# Connection pool sizes used for every remote host. POOL_MAXSIZE bounds the number of
+# keep-alive connections kept open to a single host (i.e. the number of threads that can
+# talk to that host at the same time without opening a throwaway connection).
+POOL_CONNECTIONS = config("HTTP_POOL_CONNECTIONS", 1, cast=int)
+POOL_MAXSIZE = config("HTTP_POOL_MAXSIZE", 10, cast=int)
+
+# Maximum number of requests that callers fanning out work (see host_limit) send to a single
+# host at the same time. Kept at or below POOL_MAXSIZE so that every request gets a pooled connection.
+MAX_CONCURRENT_PER_HOST = min(config("HTTP_MAX_CONCURRENT_PER_HOST", 4, cast=int), POOL_MAXSIZE)
+
+# A host's circuit opens after CIRCUIT_FAILURE_THRESHOLD consecutive failed requests (timeouts,
+# connection errors or 5xx responses). While open, requests to the host fail fast with a 503 status.
+# After CIRCUIT_RESET_TIMEOUT seconds, a single trial request is let through (half-open).
+CIRCUIT_FAILURE_THRESHOLD = config("CIRCUIT_FAILURE_THRESHOLD", 3, cast=int)
+CIRCUIT_RESET_TIMEOUT = config("CIRCUIT_RESET_TIMEOUT", 30, cast=float)
+
+# Cached GET responses are used without revalidation for CACHE_TTL seconds and are served (stale)
+# when the remote node fails for up to CACHE_STALE_IF_ERROR seconds. The cache holds at most
+# CACHE_MAX_ENTRIES responses, the least recently used ones are evicted first.
+CACHE_TTL = config("HTTP_CACHE_TTL", 30, cast=float)
+CACHE_STALE_IF_ERROR = config("HTTP_CACHE_STALE_IF_ERROR", 24 * 60 * 60, cast=float)
+CACHE_MAX_ENTRIES = config("HTTP_CACHE_MAX_ENTRIES", 1000, cast=int)
+
 def parse_res_to_dict(response):
     """ 
     Checks if response is a list.
@@ -31,6 +64,283 @@ def parse_res_to_dict(response):
 # Django Software Foundation, "Logging", https://docs.djangoproject.com/en/3.2/topics/logging/
 logger = logging.getLogger(__name__)
 
+class CircuitOpenError(Exception):
+    """ Raised when a request is not sent because the circuit of the remote host is open. """
+    pass
+
+
+class CircuitBreaker:
+    """ Circuit breaker for requests to a single remote host.
+
+        closed      Requests are sent. Consecutive failures are counted, and the circuit opens
+                    once there are CIRCUIT_FAILURE_THRESHOLD of them.
+        open        Requests fail fast without being sent, until CIRCUIT_RESET_TIMEOUT seconds have passed.
+        half-open   One trial request is sent. The circuit closes if it succeeds and opens again if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, host, failure_threshold=None, reset_timeout=None):
+        self.host = host
+        self.failure_threshold = failure_threshold or CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or CIRCUIT_RESET_TIMEOUT
+        self.failures = 0
+        self.opened_at = None
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """ Gets the current state of the circuit. """
+
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow_request(self):
+        """ Returns true if a request to the host may be sent now. """
+
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            elif state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            else:
+                return False
+
+    def record_success(self):
+        """ Records a successful request, closing the circuit. """
+
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit for {self.host} closed")
+            self._state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """ Records a failed request, opening the circuit if there were too many failures. """
+
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit for {self.host} opened after {self.failures} failures")
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def as_json(self):
+        """ Gets the state of the circuit as a dict. """
+
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+            return {
+                "host": self.host,
+                "state": state,
+                "failures": self.failures,
+                "retryIn": retry_in
+            }
+
+
+class CacheEntry:
+    """ A cached JSON response along with its validators. """
+
+    def __init__(self, data, etag=None, last_modified=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.stored_at
+
+    def is_fresh(self):
+        """ Checks if the response can be used without revalidating it. """
+        return self.age() < CACHE_TTL
+
+    def is_usable_if_error(self):
+        """ Checks if the response can be used when the remote node fails. """
+        return self.age() < CACHE_STALE_IF_ERROR
+
+    def revalidated(self):
+        """ Marks the response as fresh after the remote node confirmed it did not change. """
+        self.stored_at = time.monotonic()
+
+    def get_data(self):
+        """ Gets a copy of the response data, callers are free to modify it. """
+        return copy.deepcopy(self.data)
+
+
+class ResponseCache:
+    """ Thread-safe LRU cache of GET responses keyed by URL. """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(url, params=None):
+        """ Gets the cache key for a GET request """
+
+        if not params:
+            return url
+        return url + "?" + urlencode(sorted(params.items()))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+response_cache = ResponseCache(CACHE_MAX_ENTRIES)
+
+
+# One HTTPAdapter (and therefore one urllib3 connection pool) per remote host. The pools are
+# thread-safe and shared by all threads. requests.Session objects are not guaranteed to be
+# thread-safe, so each thread gets its own session which mounts the shared per-host adapters.
+# Python Software Foundation, "threading - Thread-local data", https://docs.python.org/3/library/threading.html#thread-local-data
+_adapters = {}
+_host_limits = {}
+_circuits = {}
+_adapters_lock = threading.Lock()
+_thread_local = threading.local()
+
+
+def get_adapter(host):
+    """ Gets the pooled HTTPAdapter for the given host, creating it if it does not exist yet. """
+
+    with _adapters_lock:
+        adapter = _adapters.get(host)
+        if adapter is None:
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            _adapters[host] = adapter
+        return adapter
+
+
+def host_limit(url):
+    """ Gets the semaphore that bounds the number of concurrent requests to the host of url.
+        Code that sends many requests from several threads should hold it around each request:
+
+            with api_requests.host_limit(url):
+                api_requests.post(url, data=data)
+    """
+
+    host = url_parser.get_host(url)
+    with _adapters_lock:
+        limit = _host_limits.get(host)
+        if limit is None:
+            limit = threading.BoundedSemaphore(MAX_CONCURRENT_PER_HOST)
+            _host_limits[host] = limit
+        return limit
+
+
+def get_circuit(url):
+    """ Gets the circuit breaker for the host of url. """
+
+    host = url_parser.get_host(url)
+    with _adapters_lock:
+        circuit = _circuits.get(host)
+        if circuit is None:
+            circuit = CircuitBreaker(host)
+            _circuits[host] = circuit
+        return circuit
+
+
+def get_circuit_states():
+    """ Gets the state of the circuit of every remote host that was contacted by this process. """
+
+    with _adapters_lock:
+        circuits = list(_circuits.values())
+    return [circuit.as_json() for circuit in circuits]
+
+
+def get_session(url):
+    """ Gets the calling thread's session with the keep-alive connection pool for the host of url mounted.
+    """
+
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # federation calls are stateless, never store or send back cookies set by remote nodes
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        _thread_local.session = session
+        _thread_local.mounted_hosts = set()
+
+    host = url_parser.get_host(url)
+    if host not in _thread_local.mounted_hosts:
+        adapter = get_adapter(host)
+        session.mount(f"http://{host}/", adapter)
+        session.mount(f"https://{host}/", adapter)
+        _thread_local.mounted_hosts.add(host)
+
+    return session
+
+
+def send(method, url, **kwargs):
+    """ Sends a request over the pooled session for the host of url, through the circuit breaker
+        of that host. Raises CircuitOpenError if the circuit is open.
+
+        Returns:
+         - (requests.Response): the response
+    """
+
+    circuit = get_circuit(url)
+    if not circuit.allow_request():
+        raise CircuitOpenError(f"Circuit for {circuit.host} is open")
+
+    try:
+        # timeout here since may need to wake up other groups heroku servers
+        response = get_session(url).request(method, url, timeout=TIMEOUT, **kwargs)
+    except Exception:
+        circuit.record_failure()
+        raise
+
+    if response.status_code >= 500:
+        circuit.record_failure()
+    else:
+        circuit.record_success()
+
+    return response
+
+
 def add_auth_header(url, headers):
     '''
         Add Auth Header for node to headers dict
@@ -42,18 +352,28 @@ def add_auth_header(url, headers):
         headers['Authorization'] = 'Basic %s' % authToken
 
 
-def get(url, params=None, send_basic_auth_header=True):
+def get(url, params=None, send_basic_auth_header=True, cached=False):
     """ Makes a GET request at the given URL and returns the JSON body of the HTTP response.
 
         Parameters:
          - url (string): The URL endpoint for the HTTP request
          - params (dict): The query string parameters (default is None)
+         - cached (bool): Use the response cache (default is False). A cached response younger than
+           CACHE_TTL seconds is returned without a request. An older one is revalidated with its ETag /
+           Last-Modified, and is returned (stale) if the remote node fails to respond.
 
         Returns:
          - (int): Status code of the HTTP response
          - (dict): JSON response data if status code of request is 200 OK and JSON parsing was successful. Otherwise, return None
     """
 
+    cache_key = ResponseCache.make_key(url, params)
+    entry = response_cache.get(cache_key) if cached else None
+
+    if entry is not None and entry.is_fresh():
+        logger.info(f"Using cached response for GET {url}")
+        return 200, entry.get_data()
+
     headers = {
         "Accept": "application/json"
     }
@@ -62,13 +382,25 @@ def get(url, params=None, send_basic_auth_header=True):
     if send_basic_auth_header:
         add_auth_header(url, headers)
 
+    # Add validators of the cached response so that the node can reply with 304 Not Modified
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
     # ref: https://stackoverflow.com/questions/15431044/can-i-set-max-retries-for-requests-request - datashaman
     # 'Can I set max_retries for requests.request?'
     try:
         logger.info(f"Trying to do GET request to {url}")
 
-        # timeout here since may need to wake up other groups heroku servers
-        response = requests.get(url, headers=headers, params=params, timeout=TIMEOUT)
+        response = send("GET", url, headers=headers, params=params)
+
+        logger.info(f"API GET request to {url} and received {response.status_code}")
+
+        if response.status_code == 304 and entry is not None:
+            entry.revalidated()
+            return 200, entry.get_data()
 
         # parse JSON response if OK
         if response.status_code == 200:
@@ -79,17 +411,58 @@ def get(url, params=None, send_basic_auth_header=True):
         else:
             response_data = None
 
-        logger.info(f"API GET request to {url} and received {response.status_code}")
+    except CircuitOpenError as error:
+        logger.warning(f"Not GET'ing {url}: {error}")
+        if entry is not None and entry.is_usable_if_error():
+            return 200, entry.get_data()
+        return 503, None
 
     except Exception as error:
         logger.error(f"Something went wrong GET'ing {url}")
         logger.error(error, exc_info=True)
+        if entry is not None and entry.is_usable_if_error():
+            return 200, entry.get_data()
         status_code = 500
         response_data = None
         return status_code, response_data
 
+    response_data = parse_res_to_dict(response_data)
+
+    if cached:
+        if response.status_code == 200 and response_data is not None:
+            response_cache.set(cache_key, CacheEntry(
+                response_data,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            ))
+        elif response.status_code >= 500 and entry is not None and entry.is_usable_if_error():
+            logger.warning(f"Using stale cached response for GET {url}")
+            return 200, entry.get_data()
+        elif response.status_code in [404, 410]:
+            response_cache.delete(cache_key)
+
     # caller should check status codes show error message to user (if needed)
-    return response.status_code, parse_res_to_dict(response_data)
+    return response.status_code, response_data
+
+
+def get_cached(url, params=None):
+    """ Gets the cached JSON body of a GET request without making a request.
+
+        Returns:
+         - (dict): The cached response data (possibly stale, up to CACHE_STALE_IF_ERROR seconds old), or None if not cached
+         - (bool): True if the cached response is fresh
+    """
+
+    entry = response_cache.get(ResponseCache.make_key(url, params))
+    if entry is None or not entry.is_usable_if_error():
+        return None, False
+    return entry.get_data(), entry.is_fresh()
+
+
+def invalidate(url, params=None):
+    """ Removes the cached response of a GET request from the response cache. """
+
+    response_cache.delete(ResponseCache.make_key(url, params))
 
 
 def post(url, params=None, data={}, send_basic_auth_header=True):
@@ -116,7 +489,7 @@ def post(url, params=None, data={}, send_basic_auth_header=True):
 
     try:
         logger.info(f"Trying to do POST request to {url}")
-        response = requests.post(url, headers=headers, params=params, json=data, timeout=TIMEOUT)
+        response = send("POST", url, headers=headers, params=params, json=data)
 
         # parse JSON response if OK
         if response.status_code == 200:
@@ -129,6 +502,10 @@ def post(url, params=None, data={}, send_basic_auth_header=True):
 
         logger.info(f"API POST request to {url} and received {response.status_code}")
 
+    except CircuitOpenError as error:
+        logger.warning(f"Not POST'ing {url}: {error}")
+        return 503, None
+
     except Exception as error:
         logger.error(f"Something went wrong POST'ing {url}")
         logger.error(error, exc_info=True)
@@ -162,7 +539,7 @@ def delete(url, params=None, send_basic_auth_header=True):
     try:
         # ref: https://stackoverflow.com/questions/15431044/can-i-set-max-retries-for-requests-request - datashaman
         # 'Can I set max_retries for requests.request?'
-        response = requests.delete(url, headers=headers, params=params, timeout=TIMEOUT)
+        response = send("DELETE", url, headers=headers, params=params)
 
         # parse JSON response if OK
         if response.status_code == 200:
@@ -175,6 +552,10 @@ def delete(url, params=None, send_basic_auth_header=True):
 
         logger.info(f"API DELETE request to {url} and received {response.status_code}")
 
+    except CircuitOpenError as error:
+        logger.warning(f"Not DELETE'ing {url}: {error}")
+        return 503, None
+
     except Exception as error:
         logger.error(f"Something went wrong DELETE'ing {url}")
         logger.error(error, exc_info=True)
@@ -184,3 +565,38 @@ def delete(url, params=None, send_basic_auth_header=True):
 
     # caller should check status codes show error message to user (if needed)
     return response.status_code, response_data
+
+
+def head(url, params=None, send_basic_auth_header=True):
+    """ Makes a HEAD request at the given URL. Useful to check if a resource exists without
+        transferring its body. Nodes that do not support HEAD reply with 405 Method Not Allowed.
+
+        Parameters:
+         - url (string): The URL endpoint for the HTTP request
+         - params (dict): The query string parameters (default is None)
+
+        Returns:
+         - (int): Status code of the HTTP response
+    """
+
+    headers = {
+        "Accept": "application/json"
+    }
+
+    if send_basic_auth_header:
+        add_auth_header(url, headers)
+
+    try:
+        response = send("HEAD", url, headers=headers, params=params)
+        logger.info(f"API HEAD request to {url} and received {response.status_code}")
+
+    except CircuitOpenError as error:
+        logger.warning(f"Not HEAD'ing {url}: {error}")
+        return 503
+
+    except Exception as error:
+        logger.error(f"Something went wrong HEAD'ing {url}")
+        logger.error(error, exc_info=True)
+        return 500
+
+    return response.status_code
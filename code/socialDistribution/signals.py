@@ -0,0 +1,128 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import LocalAuthor, LocalPost, InboxPost, Follow, Comment, PostLike, CommentLike
+from . import friend_graph, timeline
+
+
+# Django Software Foundation, "Signals", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/topics/signals/
+@receiver(post_save, sender=LocalPost)
+def fan_out_local_post(sender, instance, **kwargs):
+    """ Add a created or edited post to (or remove it from) the timelines of local authors. """
+    timeline.fan_out_local_post(instance)
+
+
+@receiver(post_save, sender=InboxPost)
+def update_inbox_post(sender, instance, created, **kwargs):
+    """ Update the timeline entries of an edited inbox post. """
+    if not created:
+        timeline.update_inbox_post(instance)
+
+
+# Django Software Foundation, "m2m_changed", 2021-12-06
+# https://docs.djangoproject.com/en/3.2/ref/signals/#m2m-changed
+@receiver(m2m_changed, sender=LocalAuthor.inbox_posts.through)
+def update_inbox_timeline(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Add posts received in an inbox to the timeline of its owner, and remove them when the inbox is cleared. """
+
+    if reverse:
+        # instance is an InboxPost, pk_set are LocalAuthor ids
+        if action == 'post_add':
+            for owner_id in pk_set:
+                timeline.add_inbox_posts(owner_id, [instance.id])
+        elif action == 'post_remove':
+            for owner_id in pk_set:
+                timeline.remove_inbox_posts(owner_id, [instance.id])
+        return
+
+    if action == 'post_add':
+        timeline.add_inbox_posts(instance.id, pk_set)
+    elif action == 'post_remove':
+        timeline.remove_inbox_posts(instance.id, pk_set)
+    elif action == 'post_clear':
+        timeline.remove_inbox_posts(instance.id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_friend_posts(sender, instance, **kwargs):
+    """ Show or hide friends posts when two local authors become friends or stop being friends. """
+    timeline.update_friend_posts(instance.actor_id, instance.object_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graphs(sender, instance, **kwargs):
+    """ Reload the friend graphs of both authors of a follow that was created or deleted. """
+    friend_graph.invalidate(instance.actor_id, instance.object_id)
+
+
+@receiver(m2m_changed, sender=LocalAuthor.follow_requests.through)
+def invalidate_request_graphs(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Reload the friend graphs of authors whose sent follow requests changed. """
+
+    if reverse:
+        # instance is the Author that sent the requests
+        if action in ['post_add', 'post_remove', 'post_clear']:
+            friend_graph.invalidate(instance.id)
+    elif action in ['post_add', 'post_remove']:
+        friend_graph.invalidate(*pk_set)
+    elif action == 'pre_clear':
+        friend_graph.invalidate(*instance.follow_requests.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=LocalAuthor)
+def build_new_timeline(sender, instance, created, **kwargs):
+    """ Fill the timeline of a new local author with the public posts. """
+    if created:
+        timeline.rebuild_timeline(instance)
+
+
+def change_counter(model, pk, field, delta):
+    """ Adds delta to a counter field of a row with a single UPDATE, so concurrent changes are not lost. """
+
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    rows.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=PostLike)
+def count_post_like(sender, instance, created, **kwargs):
+    """ Count a new like on a post. """
+    if created:
+        change_counter(LocalPost, instance.object_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=PostLike)
+def uncount_post_like(sender, instance, **kwargs):
+    """ Uncount a removed like on a post. """
+    change_counter(LocalPost, instance.object_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=CommentLike)
+def count_comment_like(sender, instance, created, **kwargs):
+    """ Count a new like on a comment. """
+    if created:
+        change_counter(Comment, instance.object_id, 'like_count', 1)
+
+
+@receiver(post_delete, sender=CommentLike)
+def uncount_comment_like(sender, instance, **kwargs):
+    """ Uncount a removed like on a comment. """
+    change_counter(Comment, instance.object_id, 'like_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    """ Count a new comment on a post. """
+    if created:
+        change_counter(LocalPost, instance.post_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    """ Uncount a deleted comment on a post. """
+    change_counter(LocalPost, instance.post_id, 'comment_count', -1)
@@ -18,9 +18,11 @@ def card_author(*args, **kwargs):
     author_type = kwargs['author_type']
     curr_user = kwargs['curr_user']
 
-    is_following = curr_user.is_following(author)
-    request_sent = author.has_follow_request(curr_user)
-    is_friend = curr_user.has_friend(author)
+    # relationships of the current user are loaded once per page (see friend_graph.py)
+    graph = curr_user.get_friend_graph()
+    is_following = graph.is_following(author.id)
+    request_sent = graph.has_requested(author.id)
+    is_friend = graph.has_friend(author.id)
 
     author_is_user = author.get_url_id() == curr_user.get_url_id()
 
@@ -28,11 +28,14 @@ def comment_card(*args, **kwargs):
     else:
         post_author_url = post.author
 
-    # is current user friends with the commenter?
-    is_friend = author.has_friend(comment_author)
-
-    # comment like data
-    is_liked, likes = get_comment_like_info(comment, author)
+    # is current user friends with the commenter? (set by single_post for all comments)
+    is_friend = comment.get("is_friend")
+    if is_friend is None:
+        is_friend = author.has_friend(comment_author)
+
+    # comment like data (prefetched by single_post with prefetch_comment_like_info)
+    like_info = comment.get("like_info")
+    is_liked, likes = like_info if like_info is not None else get_comment_like_info(comment, author)
     like_text = get_like_text(is_liked, likes)
 
     return {
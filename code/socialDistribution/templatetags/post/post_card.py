@@ -23,7 +23,9 @@ def post_card(post, author):
     else:
         post_type = 'local'
 
-    is_liked, likes = get_post_like_info(post, author)
+    # like info is prefetched for whole pages by prefetch_like_info
+    like_info = getattr(post, '_like_info', None)
+    is_liked, likes = like_info if like_info is not None else get_post_like_info(post, author)
     like_text = get_like_text(is_liked, likes)
 
     
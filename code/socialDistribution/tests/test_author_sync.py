@@ -0,0 +1,97 @@
+# python manage.py test socialDistribution.tests.test_author_sync
+
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+import datetime
+import logging
+
+from socialDistribution.author_sync import diff_authors, apply_author_diff, cache_authors
+from socialDistribution.models import Author, LocalAuthor
+
+
+class AuthorSyncTests(TestCase):
+    """ Unit tests for the remote author diff used by socialDistribution.author_sync """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def remote_json(self, url, displayName):
+        return {
+            "type": "author",
+            "id": url,
+            "url": url,
+            "host": "https://remote.example.com/",
+            "displayName": displayName,
+            "github": "https://github.com/" + displayName,
+            "profileImage": None,
+        }
+
+    def test_new_authors_created(self):
+        url = "https://remote.example.com/api/author/1"
+        to_create, to_update = diff_authors([self.remote_json(url, "alice")])
+        self.assertEqual(len(to_create), 1)
+        self.assertEqual(to_update, [])
+
+        apply_author_diff(to_create, to_update)
+        author = Author.objects.get(url=url)
+        self.assertEqual(author.displayName, "alice")
+        self.assertEqual(author.githubUrl, "https://github.com/alice")
+
+    def test_unchanged_authors_not_written(self):
+        url = "https://remote.example.com/api/author/1"
+        apply_author_diff(*diff_authors([self.remote_json(url, "alice")]))
+
+        to_create, to_update = diff_authors([self.remote_json(url, "alice")])
+        self.assertEqual(to_create, [])
+        self.assertEqual(to_update, [])
+
+    def test_changed_authors_updated(self):
+        url = "https://remote.example.com/api/author/1"
+        apply_author_diff(*diff_authors([self.remote_json(url, "alice")]))
+        old_timestamp = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+        Author.objects.filter(url=url).update(_last_updated=old_timestamp)
+
+        to_create, to_update = diff_authors([self.remote_json(url, "bob")])
+        self.assertEqual(to_create, [])
+        self.assertEqual(len(to_update), 1)
+
+        apply_author_diff(to_create, to_update)
+        author = Author.objects.get(url=url)
+        self.assertEqual(author.displayName, "bob")
+        self.assertGreater(author._last_updated, old_timestamp)
+
+    def test_duplicate_remote_authors(self):
+        url = "https://remote.example.com/api/author/1"
+        to_create, to_update = diff_authors([self.remote_json(url, "alice"), self.remote_json(url, "bob")])
+        self.assertEqual(len(to_create), 1)
+        self.assertEqual(to_create[0].displayName, "bob")
+
+    def test_local_authors_not_updated(self):
+        author = mixer.blend(LocalAuthor)
+        author = LocalAuthor.objects.get(id=author.id)
+
+        to_create, to_update = diff_authors([self.remote_json(author.url, "mallory")])
+        self.assertEqual(to_create, [])
+        self.assertEqual(to_update, [])
+
+    def test_cache_authors(self):
+        known = mixer.blend(LocalAuthor, user=None)
+        known.refresh_from_db()
+        url = "https://remote.example.com/api/author/1"
+        commenters = [self.remote_json(url, "alice"), known.as_json(), self.remote_json(url, "alice")]
+
+        cached = cache_authors(commenters)
+        self.assertEqual(set(cached.keys()), {url, known.url})
+        self.assertEqual(cached[known.url].id, known.id)
+        self.assertEqual(cached[url], Author.objects.get(url=url))
@@ -0,0 +1,132 @@
+# python manage.py test socialDistribution.tests.test_dispatchers
+
+from django.test import TestCase
+from django.utils import timezone
+
+from unittest import mock
+import logging
+
+import socialDistribution.requests as api_requests
+from socialDistribution.dispatchers import dispatch_activity, _drain_inbox
+from socialDistribution.models import OutboxItem
+
+# nothing listens on port 1, so every delivery fails right away
+UNREACHABLE_INBOX = "http://127.0.0.1:1/api/author/1/inbox/"
+
+
+class OutboxTests(TestCase):
+    """ Unit tests for the outbox used to deliver activities to remote inboxes """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_dispatch_activity_enqueues(self):
+        dispatch_activity(UNREACHABLE_INBOX, {"type": "Like"})
+
+        item = OutboxItem.objects.get()
+        self.assertEqual(UNREACHABLE_INBOX, item.url)
+        self.assertEqual("127.0.0.1:1", item.host)
+        self.assertEqual({"type": "Like"}, item.data)
+        self.assertEqual(OutboxItem.Status.PENDING, item.status)
+
+    def test_failed_delivery_is_retried_later(self):
+        first = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post", "title": "first"})
+        second = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post", "title": "second"})
+
+        delivered = _drain_inbox(first.url)
+        self.assertEqual(0, delivered)
+
+        first.refresh_from_db()
+        self.assertEqual(OutboxItem.Status.PENDING, first.status)
+        self.assertEqual(1, first.attempts)
+        # 500 if the request failed, 503 if the circuit for the host is already open
+        self.assertIn(first.last_status_code, [500, 503])
+        self.assertGreater(first.next_attempt, timezone.now())
+
+        # items behind a failed item for the same inbox wait for it
+        second.refresh_from_db()
+        self.assertEqual(0, second.attempts)
+
+        # nothing is retried before the backoff expires
+        _drain_inbox(first.url)
+        first.refresh_from_db()
+        self.assertEqual(1, first.attempts)
+
+    def test_failed_inbox_does_not_block_host(self):
+        other_inbox = "http://127.0.0.1:1/api/author/2/inbox/"
+        failing = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post", "title": "first"})
+        waiting = OutboxItem.enqueue(other_inbox, {"type": "post", "title": "second"})
+        self.assertEqual(failing.host, waiting.host)
+
+        with mock.patch('socialDistribution.dispatchers.deliver', return_value=503):
+            self.assertEqual(0, _drain_inbox(failing.url))
+
+        # another inbox on the same host is delivered right away
+        with mock.patch('socialDistribution.dispatchers.deliver', return_value=201) as deliver:
+            self.assertEqual(1, _drain_inbox(waiting.url))
+        deliver.assert_called_once_with(other_inbox, waiting.data)
+        self.assertFalse(OutboxItem.objects.filter(id=waiting.id).exists())
+
+    def test_likes_invalidated_on_delivery(self):
+        likes_url = "http://127.0.0.1:1/api/author/1/posts/2/likes"
+        like = {"type": "Like", "object": "http://127.0.0.1:1/api/author/1/posts/2"}
+        api_requests.response_cache.set(likes_url, api_requests.CacheEntry({"items": []}))
+        item = OutboxItem.enqueue(UNREACHABLE_INBOX, like)
+
+        # the cached likes are kept until the like is delivered
+        with mock.patch('socialDistribution.dispatchers.deliver', return_value=500):
+            _drain_inbox(item.url)
+        self.assertIsNotNone(api_requests.response_cache.get(likes_url))
+
+        OutboxItem.objects.filter(id=item.id).update(next_attempt=timezone.now())
+        with mock.patch('socialDistribution.dispatchers.deliver', return_value=201):
+            self.assertEqual(1, _drain_inbox(item.url))
+        self.assertIsNone(api_requests.response_cache.get(likes_url))
+
+    def test_comments_invalidated_on_delivery(self):
+        comments_url = "http://127.0.0.1:1/api/author/1/posts/2/comments"
+        comment = {"type": "comment", "object": "http://127.0.0.1:1/api/author/1/posts/2"}
+        api_requests.response_cache.set(comments_url, api_requests.CacheEntry({"comments": []}))
+        item = OutboxItem.enqueue(UNREACHABLE_INBOX, comment)
+
+        with mock.patch('socialDistribution.dispatchers.deliver', return_value=201):
+            self.assertEqual(1, _drain_inbox(item.url))
+        self.assertIsNone(api_requests.response_cache.get(comments_url))
+
+    def test_backoff_grows_exponentially(self):
+        item = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post"})
+
+        item.record_failure(503)
+        first_delay = item.next_attempt - timezone.now()
+        item.record_failure(503)
+        second_delay = item.next_attempt - timezone.now()
+
+        self.assertGreater(second_delay, first_delay * 1.5)
+
+    def test_client_error_is_dead_lettered(self):
+        item = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post"})
+        item.record_failure(404)
+        self.assertEqual(OutboxItem.Status.DEAD, item.status)
+
+    def test_dead_lettered_after_max_attempts(self):
+        item = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post"})
+        for i in range(OutboxItem.MAX_ATTEMPTS):
+            item.record_failure(500)
+
+        self.assertEqual(OutboxItem.Status.DEAD, item.status)
+
+        # dead items do not block the rest of the outbox
+        other = OutboxItem.enqueue(UNREACHABLE_INBOX, {"type": "post"})
+        _drain_inbox(other.url)
+        other.refresh_from_db()
+        self.assertEqual(1, other.attempts)
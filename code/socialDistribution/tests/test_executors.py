@@ -0,0 +1,88 @@
+# python manage.py test socialDistribution.tests.test_executors
+
+from django.test import TestCase
+
+import logging
+import threading
+
+from socialDistribution.executors import KeyedExecutor
+
+
+class KeyedExecutorTests(TestCase):
+    """ Unit tests for the KeyedExecutor used by socialDistribution.fetchers """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.executor = KeyedExecutor("test", max_workers=2, max_queue_size=2)
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.executor.shutdown(wait=True, timeout=5)
+
+    def block(self):
+        self.started.set()
+        self.release.wait(5)
+
+    def test_runs_task(self):
+        done = threading.Event()
+        self.assertTrue(self.executor.submit("key", done.set))
+        self.assertTrue(done.wait(5))
+
+    def test_duplicate_key_dropped(self):
+        self.assertTrue(self.executor.submit("key", self.block))
+        self.assertTrue(self.started.wait(5))
+
+        # same key is running
+        self.assertFalse(self.executor.submit("key", self.block))
+        self.assertEqual(self.executor.stats()["deduplicated"], 1)
+
+        # key can be submitted again once the task is done
+        self.release.set()
+        self.executor.shutdown(wait=True, timeout=5)
+        self.assertEqual(self.executor.stats()["inFlight"], 0)
+        self.assertEqual(self.executor.stats()["completed"], 1)
+
+    def test_full_queue_rejected(self):
+        executor = KeyedExecutor("test-full", max_workers=1, max_queue_size=1)
+        try:
+            # first task occupies the only worker, second fills the queue
+            self.assertTrue(executor.submit("a", self.block))
+            self.assertTrue(self.started.wait(5))
+            self.assertTrue(executor.submit("b", self.block))
+            self.assertFalse(executor.submit("c", self.block))
+
+            stats = executor.stats()
+            self.assertEqual(stats["queueDepth"], 1)
+            self.assertEqual(stats["inFlight"], 2)
+            self.assertEqual(stats["rejected"], 1)
+            self.assertEqual(stats["workers"], 1)
+        finally:
+            self.release.set()
+            executor.shutdown(wait=True, timeout=5)
+
+    def test_failed_task_counted(self):
+        def fail():
+            raise ValueError("failed")
+
+        self.executor.submit("key", fail)
+        self.executor.shutdown(wait=True, timeout=5)
+        self.assertEqual(self.executor.stats()["failed"], 1)
+        self.assertEqual(self.executor.stats()["inFlight"], 0)
+
+    def test_no_tasks_after_shutdown(self):
+        self.executor.shutdown()
+        self.assertFalse(self.executor.submit("key", self.block))
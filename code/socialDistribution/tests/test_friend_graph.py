@@ -0,0 +1,79 @@
+# python manage.py test socialDistribution.tests.test_friend_graph
+
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+import logging
+
+from socialDistribution.friend_graph import load
+from socialDistribution.models import Author, LocalAuthor, Follow
+
+
+class FriendGraphTests(TestCase):
+    """ Unit tests for the friend graph used by LocalAuthor relationship checks """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.author = mixer.blend(LocalAuthor, user=None)
+        self.friend = mixer.blend(LocalAuthor, user=None)
+        self.follower = mixer.blend(Author)
+        self.followed = mixer.blend(Author)
+
+        Follow.objects.create(actor=self.author, object=self.friend)
+        Follow.objects.create(actor=self.friend, object=self.author)
+        Follow.objects.create(actor=self.follower, object=self.author)
+        Follow.objects.create(actor=self.author, object=self.followed)
+
+    def test_load(self):
+        graph = load(self.author.id)
+        self.assertEqual(graph.followers, {self.friend.id, self.follower.id})
+        self.assertEqual(graph.following, {self.friend.id, self.followed.id})
+        self.assertEqual(graph.friends, {self.friend.id})
+
+    def test_relationship_checks(self):
+        self.assertTrue(self.author.has_friend(self.friend))
+        self.assertFalse(self.author.has_friend(self.follower))
+        self.assertTrue(self.author.has_follower(self.follower))
+        self.assertTrue(self.author.is_following(self.followed))
+        self.assertFalse(self.author.is_following(self.follower))
+        self.assertEqual(self.author.get_friends(), [Author.objects.get(id=self.friend.id)])
+
+    def test_checks_do_not_query(self):
+        self.author.get_friend_graph()
+
+        with self.assertNumQueries(0):
+            for other in [self.friend, self.follower, self.followed] * 10:
+                self.author.has_friend(other)
+                self.author.is_following(other)
+
+    def test_follow_changes_invalidate(self):
+        self.assertFalse(self.author.has_friend(self.follower))
+
+        Follow.objects.create(actor=self.author, object=self.follower)
+        self.assertTrue(self.author.has_friend(self.follower))
+
+        Follow.objects.filter(actor=self.follower, object=self.author).delete()
+        self.assertFalse(self.author.has_friend(self.follower))
+        self.assertFalse(self.author.has_follower(self.follower))
+
+    def test_follow_requests(self):
+        other = mixer.blend(LocalAuthor, user=None)
+        self.assertFalse(self.author.get_friend_graph().has_requested(other.id))
+
+        other.follow_requests.add(self.author)
+        self.assertTrue(self.author.get_friend_graph().has_requested(other.id))
+
+        other.follow_requests.clear()
+        self.assertFalse(self.author.get_friend_graph().has_requested(other.id))
@@ -0,0 +1,81 @@
+# python manage.py test socialDistribution.tests.test_indexes
+
+from django.db import connection, IntegrityError, transaction
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+import logging
+import re
+import unittest
+
+from socialDistribution.models import Author, LocalAuthor, LocalPost, InboxPost, Comment, TimelineEntry
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "query plans are only checked on SQLite")
+class IndexTests(TestCase):
+    """ Checks that the hot lookups are answered by an index rather than a table scan """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.author = mixer.blend(LocalAuthor, user=None)
+        self.post = mixer.blend(LocalPost, author=self.author)
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+
+    def test_author_url(self):
+        self.assertUsesIndex(Author.objects.filter(url=self.author.url), 'socialDistribution_author_url')
+
+    def test_comments_of_post(self):
+        comments = Comment.objects.filter(post=self.post).order_by('-pub_date')
+        self.assertUsesIndex(comments, 'comment_post_pub_date_idx')
+
+    def test_posts_of_author(self):
+        posts = LocalPost.objects.filter(author=self.author).order_by('-published')
+        self.assertUsesIndex(posts, 'localpost_author_pub_idx')
+
+    def test_inbox_post_lookups(self):
+        # SQLite creates the index of the unique constraint with the table, under an automatic name
+        plan = InboxPost.objects.filter(public_id='http://example.com/post').explain()
+        self.assertRegex(plan, re.escape('USING INDEX sqlite_autoindex_socialDistribution_inboxpost_') + r'\d+ \(public_id=\?\)')
+
+        self.assertUsesIndex(
+            InboxPost.objects.filter(author='http://example.com/author').order_by('-published'),
+            'inboxpost_author_pub_idx'
+        )
+
+    def test_feed(self):
+        plan = LocalPost.objects.feed_for(self.author, limit=10).explain()
+        self.assertIn('localpost_visibility_pub_idx', plan)
+        self.assertIn('localpost_author_pub_idx', plan)
+
+        # the branches of the OR are found with separate indexes, so their union is sorted
+        # afterwards (see PostQuerySet.feed_for)
+        self.assertIn('USE TEMP B-TREE FOR ORDER BY', plan)
+
+    def test_inbox_of_author(self):
+        plan = self.author.inbox_posts.order_by('-published').explain()
+        self.assertIn('socialDistribution_localauthor_inbox_posts_localauthor_id_inboxpost_id', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_timeline(self):
+        entries = TimelineEntry.objects.filter(owner=self.author)
+        self.assertUsesIndex(entries, 'timeline_owner_published_idx')
+
+    def test_duplicate_inbox_post(self):
+        mixer.blend(InboxPost, public_id='http://example.com/post', _author_json={})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            mixer.blend(InboxPost, public_id='http://example.com/post', _author_json={})
@@ -0,0 +1,56 @@
+# python manage.py test socialDistribution.tests.test_liveness
+
+from django.test import TestCase
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+import datetime
+import logging
+
+from socialDistribution.liveness import due_authors, interleave_by_host, sweep, CHECK_INTERVAL
+from socialDistribution.models import Author, LocalAuthor
+
+
+class LivenessTests(TestCase):
+    """ Unit tests for the remote author liveness sweep in socialDistribution.liveness """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_only_due_remote_authors(self):
+        never_checked = Author.objects.create(url="http://127.0.0.1:4/api/author/1")
+        overdue = Author.objects.create(url="http://127.0.0.1:4/api/author/2",
+                                        _last_checked=timezone.now() - CHECK_INTERVAL * 2)
+        Author.objects.create(url="http://127.0.0.1:4/api/author/3", _last_checked=timezone.now())
+        mixer.blend(LocalAuthor)
+
+        self.assertEqual(due_authors(), [never_checked, overdue])
+
+    def test_interleave_by_host(self):
+        a1 = Author(url="https://a.example.com/api/author/1")
+        a2 = Author(url="https://a.example.com/api/author/2")
+        a3 = Author(url="https://a.example.com/api/author/3")
+        b1 = Author(url="https://b.example.com/api/author/1")
+
+        self.assertEqual(interleave_by_host([a1, a2, a3, b1]), [a1, b1, a2, a3])
+
+    def test_sweep_saves_progress(self):
+        # nothing listens on port 4, so the check fails without deleting the author
+        author = Author.objects.create(url="http://127.0.0.1:4/api/author/1")
+
+        checked, deleted = sweep()
+        self.assertEqual((checked, deleted), (1, 0))
+
+        author.refresh_from_db()
+        self.assertIsNotNone(author._last_checked)
+        self.assertEqual(due_authors(), [])
@@ -2,16 +2,22 @@
 
 from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 from django.test.testcases import LiveServerTestCase, LiveServerThread
 from mixer.backend.django import mixer
 
 from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
 import logging
 
 from socialDistribution.models import *
 from socialDistribution.builders import *
 from cmput404.constants import API_BASE
+import socialDistribution.requests as api_requests
+from socialDistribution.executors import fetch_executor
+from socialDistribution.fetchers import fetch_post_updates, update_post, POST_REFRESH_INTERVAL
 
 class AuthorTests(LiveServerTestCase):
     """ Unit tests for Author. """
@@ -119,8 +125,92 @@ class PostTest(TestCase):
         post = PostBuilder().likes(likes).build()
         self.assertTrue(post.total_likes() == likes)
 
+    def test_inbox_post_author_as_json(self):
+        received_json = {"type": "author", "id": "http://127.0.0.1:4/author/1", "displayName": "Old Name"}
+        post = mixer.blend(InboxPost, author=received_json["id"], _author_json=received_json)
+
+        # without a cached author, the author is served as it was received
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author_as_json, received_json)
+
+        # with one, the cached author is served
+        cached = mixer.blend(Author, url=received_json["id"], displayName="New Name")
+        post.cached_author = cached
+        self.assertEqual(post.author_as_json, cached.as_json())
+
+    def test_inbox_post_cached_comments(self):
+        post = mixer.blend(InboxPost, public_id="http://127.0.0.1:4/author/1/posts/1", _author_json={})
+        comments_url = post.get_comments_url()
+
+        # comments that are not cached are left out
+        self.assertNotIn("commentsSrc", post.as_json())
+
+        comment = {"type": "comment", "id": f"{comments_url}/1", "comment": "hello"}
+        api_requests.response_cache.set(comments_url, api_requests.CacheEntry({"comments": [comment]}))
+        try:
+            self.assertEqual(post.as_json()["commentsSrc"], [comment])
+        finally:
+            api_requests.invalidate(comments_url)
+
+    def test_inbox_post_refresh(self):
+        post = mixer.blend(
+            InboxPost,
+            author="http://example.com/author/1",
+            public_id="http://example.com/author/1/posts/1",
+            visibility=InboxPost.Visibility.PUBLIC,
+            _author_json={}
+        )
+        self.assertIsNone(post._last_checked)
+
+        # the home node is unavailable, so the post is kept and only the check is recorded
+        with mock.patch('socialDistribution.requests.get', return_value=(503, None)) as get:
+            post.fetch_update()
+        get.assert_called_once_with("http://example.com/author/1/posts/1", cached=False)
+        post.refresh_from_db()
+        self.assertIsNotNone(post._last_checked)
+
+        # recently checked posts are not checked again
+        with mock.patch.object(fetch_executor, 'submit') as submit:
+            fetch_post_updates([post])
+        submit.assert_not_called()
+
+        post._last_checked -= timedelta(seconds=POST_REFRESH_INTERVAL + 1)
+        with mock.patch.object(fetch_executor, 'submit') as submit:
+            fetch_post_updates([post])
+        submit.assert_called_once_with(("post", post.id), update_post, post.id)
+
+        # posts that were deleted on their home node are deleted
+        with mock.patch('socialDistribution.requests.get', return_value=(404, None)):
+            post.fetch_update()
+        self.assertFalse(InboxPost.objects.filter(id=post.id).exists())
+
     # TODO test all PostQuerySet methods
 
+    def test_feed_for(self):
+        author = mixer.blend(LocalAuthor, user=None)
+        friend = mixer.blend(LocalAuthor, user=None)
+        followed = mixer.blend(LocalAuthor, user=None)
+        Follow.objects.create(actor=author, object=friend)
+        Follow.objects.create(actor=friend, object=author)
+        Follow.objects.create(actor=author, object=followed)
+
+        def make_post(poster, visibility, unlisted=False):
+            return mixer.blend(LocalPost, author=poster, visibility=visibility, unlisted=unlisted)
+
+        public_post = make_post(followed, LocalPost.Visibility.PUBLIC)
+        own_private_post = make_post(author, LocalPost.Visibility.PRIVATE)
+        friend_post = make_post(friend, LocalPost.Visibility.FRIENDS)
+        make_post(followed, LocalPost.Visibility.FRIENDS)
+        make_post(friend, LocalPost.Visibility.PRIVATE)
+        make_post(friend, LocalPost.Visibility.PUBLIC, unlisted=True)
+
+        with self.assertNumQueries(1):
+            feed = list(LocalPost.objects.feed_for(author))
+
+        self.assertEqual(set(feed), {public_post, own_private_post, friend_post})
+        self.assertEqual(feed, sorted(feed, key=lambda post: post.published, reverse=True))
+        self.assertEqual(len(LocalPost.objects.feed_for(author, limit=2)), 2)
+
 
 class CommentModelTests(TestCase):
 
@@ -234,3 +324,166 @@ class LikeTests(TransactionTestCase):
         self.assertEqual(0, post.likes.count())
         post.likes.create(author=author)
         self.assertEqual(1, post.likes.count())
+
+
+class CounterTests(TestCase):
+    """ Unit tests for the like and comment counters of LocalPost and Comment """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.author = mixer.blend(LocalAuthor, user=None)
+        self.post = mixer.blend(LocalPost, author=self.author)
+
+    def make_comment(self):
+        return Comment.objects.create(author=self.author, post=self.post, comment="hi", pub_date=datetime.now(timezone.utc))
+
+    def test_post_like_count(self):
+        like = self.post.likes.create(author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.total_likes(), 1)
+
+        like.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.total_likes(), 0)
+
+    def test_comment_counts(self):
+        comment = self.make_comment()
+        comment.likes.create(author=self.author)
+        comment.refresh_from_db()
+        self.assertEqual(comment.total_likes(), 1)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.as_json()["count"], 1)
+
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_save_keeps_counters(self):
+        stale = LocalPost.objects.get(id=self.post.id)
+        self.post.likes.create(author=self.author)
+
+        stale.title = "edited"
+        stale.save()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, "edited")
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_copy_resets_counters(self):
+        self.post.likes.create(author=self.author)
+        self.post.refresh_from_db()
+
+        self.post.pk = None
+        self.post.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_repair_counters(self):
+        self.post.likes.create(author=self.author)
+        comment = self.make_comment()
+        LocalPost.objects.filter(id=self.post.id).update(like_count=5, comment_count=0)
+        Comment.objects.filter(id=comment.id).update(like_count=3)
+
+        call_command('repair_counters', stdout=StringIO())
+
+        self.post.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+        self.assertEqual(comment.like_count, 0)
+
+
+class BulkAsJsonTests(TestCase):
+    """ Unit tests for LocalPost.bulk_as_json """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_local_posts(self):
+        author = mixer.blend(LocalAuthor, user=None)
+        commenter = mixer.blend(Author)
+        category = Category.objects.create(category="test")
+
+        for i in range(4):
+            post = mixer.blend(LocalPost, author=author)
+            post.categories.add(category)
+            for j in range(i * 2):
+                Comment.objects.create(author=commenter, post=post, comment=f"comment {j}",
+                                       pub_date=datetime.now(timezone.utc) - timedelta(minutes=j))
+
+        expected = [post.as_json() for post in LocalPost.objects.order_by('published')]
+
+        # posts, authors, categories and comments (with their authors)
+        with self.assertNumQueries(4):
+            actual = LocalPost.bulk_as_json(LocalPost.objects.order_by('published'))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(len(actual[-1]["commentsSrc"]["comments"]), 5)
+
+
+class CategoryTests(TestCase):
+    """ Unit tests for resolving and setting post categories """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_resolve(self):
+        existing = Category.objects.create(category="Cats")
+        self.assertEqual(existing.normalized, "cats")
+
+        # one lookup, one insert and one read of the created categories
+        with self.assertNumQueries(3):
+            categories = Category.resolve(["cats", "Dogs", "", "CATS", "birds"])
+
+        self.assertEqual([category.category for category in categories], ["Cats", "Dogs", "birds"])
+        self.assertEqual(categories[0], existing)
+        self.assertEqual(Category.objects.count(), 3)
+
+        # nothing is created when all categories exist
+        with self.assertNumQueries(1):
+            self.assertEqual(Category.resolve(["dogs", "BIRDS"]), categories[1:])
+
+    def test_set_categories(self):
+        post = mixer.blend(LocalPost, author=mixer.blend(LocalAuthor, user=None))
+
+        post.set_categories(["a", "b", "A"])
+        self.assertEqual(sorted(post.categories.values_list('normalized', flat=True)), ["a", "b"])
+
+        post.set_categories(["B", "c"])
+        self.assertEqual(sorted(post.categories.values_list('normalized', flat=True)), ["b", "c"])
+
+        post.set_categories([])
+        self.assertFalse(post.categories.exists())
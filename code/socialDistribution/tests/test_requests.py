@@ -0,0 +1,212 @@
+# python manage.py test socialDistribution.tests.test_requests
+
+from django.test import TestCase
+
+import logging
+import threading
+import time
+
+import socialDistribution.requests as api_requests
+
+
+class SessionPoolTests(TestCase):
+    """ Unit tests for the pooled sessions used by socialDistribution.requests """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_one_adapter_per_host(self):
+        session = api_requests.get_session("https://node-a.example.com/api/authors/")
+        adapter_a = session.get_adapter("https://node-a.example.com/api/authors/")
+        adapter_b = session.get_adapter("https://node-b.example.com/api/authors/")
+
+        self.assertIs(adapter_a, api_requests.get_adapter("node-a.example.com"))
+        self.assertIsNot(adapter_a, adapter_b)
+
+    def test_session_reused_within_thread(self):
+        first = api_requests.get_session("https://node-a.example.com/api/authors/")
+        second = api_requests.get_session("https://node-b.example.com/api/authors/")
+        self.assertIs(first, second)
+
+    def test_adapter_shared_across_threads(self):
+        url = "https://node-c.example.com/api/authors/"
+        main_session = api_requests.get_session(url)
+        found = {}
+
+        def worker():
+            session = api_requests.get_session(url)
+            found["session"] = session
+            found["adapter"] = session.get_adapter(url)
+
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+
+        # each thread has its own session, but both use the same connection pool
+        self.assertIsNot(found["session"], main_session)
+        self.assertIs(found["adapter"], main_session.get_adapter(url))
+
+
+class CircuitBreakerTests(TestCase):
+    """ Unit tests for the per-host circuit breaker """
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_opens_after_threshold(self):
+        circuit = api_requests.CircuitBreaker("node.example.com", failure_threshold=3, reset_timeout=60)
+
+        circuit.record_failure()
+        circuit.record_failure()
+        self.assertEqual(api_requests.CircuitBreaker.CLOSED, circuit.state)
+        self.assertTrue(circuit.allow_request())
+
+        circuit.record_failure()
+        self.assertEqual(api_requests.CircuitBreaker.OPEN, circuit.state)
+        self.assertFalse(circuit.allow_request())
+
+    def test_success_resets_failures(self):
+        circuit = api_requests.CircuitBreaker("node.example.com", failure_threshold=2, reset_timeout=60)
+
+        circuit.record_failure()
+        circuit.record_success()
+        circuit.record_failure()
+        self.assertEqual(api_requests.CircuitBreaker.CLOSED, circuit.state)
+
+    def test_half_open_allows_single_trial(self):
+        circuit = api_requests.CircuitBreaker("node.example.com", failure_threshold=1, reset_timeout=0.01)
+        circuit.record_failure()
+        time.sleep(0.02)
+
+        self.assertEqual(api_requests.CircuitBreaker.HALF_OPEN, circuit.state)
+        self.assertTrue(circuit.allow_request())
+        self.assertFalse(circuit.allow_request())
+
+        circuit.record_success()
+        self.assertEqual(api_requests.CircuitBreaker.CLOSED, circuit.state)
+
+    def test_failed_trial_reopens(self):
+        circuit = api_requests.CircuitBreaker("node.example.com", failure_threshold=1, reset_timeout=0.01)
+        circuit.record_failure()
+        time.sleep(0.02)
+
+        self.assertTrue(circuit.allow_request())
+        circuit.record_failure()
+        self.assertEqual(api_requests.CircuitBreaker.OPEN, circuit.state)
+
+    def test_open_circuit_fails_fast(self):
+        url = "http://127.0.0.1:2/api/authors/"
+        circuit = api_requests.get_circuit(url)
+        for i in range(circuit.failure_threshold):
+            circuit.record_failure()
+
+        status_code, response_data = api_requests.get(url, send_basic_auth_header=False)
+        self.assertEqual(503, status_code)
+        self.assertIsNone(response_data)
+
+        states = {state["host"]: state for state in api_requests.get_circuit_states()}
+        self.assertEqual(api_requests.CircuitBreaker.OPEN, states["127.0.0.1:2"]["state"])
+
+
+class ResponseCacheTests(TestCase):
+    """ Unit tests for the GET response cache """
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        api_requests.response_cache.clear()
+
+    def test_lru_eviction(self):
+        cache = api_requests.ResponseCache(max_entries=2)
+        cache.set("a", api_requests.CacheEntry({"id": "a"}))
+        cache.set("b", api_requests.CacheEntry({"id": "b"}))
+        cache.get("a")
+        cache.set("c", api_requests.CacheEntry({"id": "c"}))
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_key_includes_params(self):
+        key1 = api_requests.ResponseCache.make_key("http://node.example.com/api/authors/", {"page": 1, "size": 5})
+        key2 = api_requests.ResponseCache.make_key("http://node.example.com/api/authors/", {"size": 5, "page": 1})
+        key3 = api_requests.ResponseCache.make_key("http://node.example.com/api/authors/", {"page": 2, "size": 5})
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+
+    def test_fresh_entry_served_without_request(self):
+        url = "http://127.0.0.1:3/api/author/1/posts/2/comments"
+        api_requests.response_cache.set(url, api_requests.CacheEntry({"comments": []}))
+
+        status_code, data = api_requests.get(url, cached=True)
+        self.assertEqual(200, status_code)
+        self.assertEqual({"comments": []}, data)
+
+        # callers can modify the data without affecting the cache
+        data["comments"].append("modified")
+        status_code, data = api_requests.get(url, cached=True)
+        self.assertEqual({"comments": []}, data)
+
+    def test_stale_entry_served_if_error(self):
+        url = "http://127.0.0.1:3/api/author/1/posts/2/likes"
+        entry = api_requests.CacheEntry({"items": []})
+        entry.stored_at -= api_requests.CACHE_TTL + 1
+        api_requests.response_cache.set(url, entry)
+
+        status_code, data = api_requests.get(url, cached=True)
+        self.assertEqual(200, status_code)
+        self.assertEqual({"items": []}, data)
+
+    def test_get_cached(self):
+        url = "http://127.0.0.1:3/api/author/1/posts/2/comments"
+        self.assertEqual((None, False), api_requests.get_cached(url))
+
+        entry = api_requests.CacheEntry({"comments": []})
+        api_requests.response_cache.set(url, entry)
+        self.assertEqual(({"comments": []}, True), api_requests.get_cached(url))
+
+        # stale entries are served until they are too old to be served on errors
+        entry.stored_at -= api_requests.CACHE_TTL + 1
+        self.assertEqual(({"comments": []}, False), api_requests.get_cached(url))
+
+        entry.stored_at -= api_requests.CACHE_STALE_IF_ERROR
+        self.assertEqual((None, False), api_requests.get_cached(url))
+
+    def test_uncached_get_ignores_cache(self):
+        url = "http://127.0.0.1:3/api/author/1"
+        api_requests.response_cache.set(url, api_requests.CacheEntry({"id": url}))
+
+        status_code, data = api_requests.get(url)
+        self.assertGreaterEqual(status_code, 500)
+        self.assertIsNone(data)
+
+    def test_invalidate(self):
+        url = "http://127.0.0.1:3/api/author/1"
+        api_requests.response_cache.set(url, api_requests.CacheEntry({"id": url}))
+        api_requests.invalidate(url)
+        self.assertIsNone(api_requests.response_cache.get(url))
@@ -0,0 +1,122 @@
+# python manage.py test socialDistribution.tests.test_timeline
+
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+import logging
+
+from socialDistribution.models import LocalAuthor, LocalPost, InboxPost, Follow, TimelineEntry
+from socialDistribution.timeline import get_timeline, rebuild_timeline
+
+
+class TimelineTests(TestCase):
+    """ Unit tests for the materialized home feed in socialDistribution.timeline """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.author = mixer.blend(LocalAuthor, user=None)
+        self.friend = mixer.blend(LocalAuthor, user=None)
+
+    def make_post(self, author, visibility=LocalPost.Visibility.PUBLIC):
+        return mixer.blend(LocalPost, author=author, visibility=visibility, unlisted=False)
+
+    def befriend(self):
+        Follow.objects.create(actor=self.author, object=self.friend)
+        Follow.objects.create(actor=self.friend, object=self.author)
+
+    def test_public_post_fanned_out(self):
+        post = self.make_post(self.friend)
+        self.assertIn(post, get_timeline(self.author))
+        self.assertIn(post, get_timeline(self.friend))
+
+    def test_new_author_gets_public_posts(self):
+        post = self.make_post(self.friend)
+        new_author = mixer.blend(LocalAuthor, user=None)
+        self.assertIn(post, get_timeline(new_author))
+
+    def test_friends_post(self):
+        post = self.make_post(self.friend, LocalPost.Visibility.FRIENDS)
+        self.assertNotIn(post, get_timeline(self.author))
+        self.assertIn(post, get_timeline(self.friend))
+
+        # becoming friends shows the post
+        self.befriend()
+        self.assertIn(post, get_timeline(self.author))
+
+        # unfollowing hides it again
+        Follow.objects.filter(actor=self.author, object=self.friend).delete()
+        self.assertNotIn(post, get_timeline(self.author))
+
+    def test_visibility_change(self):
+        post = self.make_post(self.friend)
+        self.assertIn(post, get_timeline(self.author))
+
+        post.visibility = LocalPost.Visibility.PRIVATE
+        post.save()
+        self.assertNotIn(post, get_timeline(self.author))
+        self.assertIn(post, get_timeline(self.friend))
+
+        post.unlisted = True
+        post.save()
+        self.assertNotIn(post, get_timeline(self.friend))
+
+    def test_deleted_post_removed(self):
+        post = self.make_post(self.friend)
+        post.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_inbox_post(self):
+        inbox_post = mixer.blend(InboxPost, unlisted=False, _author_json={})
+        self.author.inbox_posts.add(inbox_post)
+        self.assertEqual(get_timeline(self.author), [inbox_post])
+        self.assertEqual(get_timeline(self.friend), [])
+
+        self.author.inbox_posts.clear()
+        self.assertEqual(get_timeline(self.author), [])
+
+    def test_inbox_post_listed_again(self):
+        inbox_post = mixer.blend(InboxPost, unlisted=False, _author_json={})
+        self.author.inbox_posts.add(inbox_post)
+
+        inbox_post.unlisted = True
+        inbox_post.save()
+        self.assertEqual(get_timeline(self.author), [])
+
+        inbox_post.unlisted = False
+        inbox_post.save()
+        self.assertEqual(get_timeline(self.author), [inbox_post])
+        self.assertEqual(get_timeline(self.friend), [])
+
+    def test_timeline_order(self):
+        posts = [self.make_post(self.friend) for i in range(3)]
+        inbox_post = mixer.blend(InboxPost, unlisted=False, _author_json={})
+        self.author.inbox_posts.add(inbox_post)
+
+        timeline = get_timeline(self.author)
+        published = [post.published for post in timeline]
+        self.assertEqual(published, sorted(published, reverse=True))
+        self.assertEqual(len(get_timeline(self.author, limit=2)), 2)
+
+    def test_rebuild_timeline(self):
+        self.befriend()
+        posts = [
+            self.make_post(self.friend),
+            self.make_post(self.friend, LocalPost.Visibility.FRIENDS),
+            self.make_post(self.author, LocalPost.Visibility.PRIVATE),
+        ]
+
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(rebuild_timeline(self.author), 3)
+        self.assertEqual(set(get_timeline(self.author)), set(posts))
@@ -0,0 +1,87 @@
+# python manage.py test socialDistribution.tests.test_utility
+
+from django.test import TestCase
+from mixer.backend.django import mixer
+
+from unittest import mock
+import logging
+import threading
+
+import socialDistribution.requests as api_requests
+from socialDistribution.models import LocalAuthor, LocalPost, InboxPost, PostLike
+from socialDistribution.utility import prefetch_like_info, prefetch_comment_like_info
+
+
+class PrefetchLikeInfoTests(TestCase):
+    """ Unit tests for socialDistribution.utility.prefetch_like_info """
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        self.author = mixer.blend(LocalAuthor, user=None)
+        self.other = mixer.blend(LocalAuthor, user=None)
+
+    def test_local_posts(self):
+        posts = [mixer.blend(LocalPost, author=self.other) for i in range(3)]
+        PostLike.objects.create(author=self.author, object=posts[0])
+        PostLike.objects.create(author=self.other, object=posts[0])
+        PostLike.objects.create(author=self.other, object=posts[1])
+
+        # the posts, and one query for the likes of the current author on all of them
+        with self.assertNumQueries(2):
+            posts = prefetch_like_info(LocalPost.objects.order_by('published'), self.author)
+
+        self.assertEqual([post._like_info for post in posts], [(True, 2), (False, 1), (False, 0)])
+
+    def test_remote_posts(self):
+        # port 4 is unassigned, so the likes requests fail
+        inbox_posts = [
+            mixer.blend(InboxPost, public_id=f'http://127.0.0.1:4/author/1/posts/{i}', _author_json={})
+            for i in range(3)
+        ]
+        local_post = mixer.blend(LocalPost, author=self.other)
+
+        posts = prefetch_like_info(inbox_posts + [local_post], self.author)
+        self.assertEqual(posts[:3], inbox_posts)
+        self.assertEqual([post._like_info for post in posts], [(None, 0)] * 3 + [(False, 0)])
+
+    def test_comment_likes(self):
+        # port 4 is unassigned, so the likes requests fail
+        comments = [{"id": f'http://127.0.0.1:4/author/1/posts/1/comments/{i}'} for i in range(3)]
+
+        prefetch_comment_like_info(comments, self.author)
+        self.assertEqual([comment["like_info"] for comment in comments], [(None, 0)] * 3)
+
+    def test_remote_posts_time_budget(self):
+        inbox_posts = [
+            mixer.blend(InboxPost, public_id=f'http://127.0.0.1:4/author/1/posts/{i}', _author_json={})
+            for i in range(2)
+        ]
+
+        # the likes of the first post are cached, but stale, so they are requested again
+        likes_url = 'http://127.0.0.1:4/author/1/posts/0/likes'
+        entry = api_requests.CacheEntry({"items": [{"author": {"id": self.author.get_url_id()}}]})
+        entry.stored_at -= api_requests.CACHE_TTL + 1
+        api_requests.response_cache.set(likes_url, entry)
+
+        # the remote node does not answer before the time budget runs out
+        answered = threading.Event()
+        try:
+            with mock.patch('socialDistribution.requests.get', side_effect=lambda *args, **kwargs: answered.wait(5) and (500, None)):
+                posts = prefetch_like_info(inbox_posts, self.author, time_budget=0.1)
+        finally:
+            answered.set()
+            api_requests.invalidate(likes_url)
+
+        self.assertEqual([post._like_info for post in posts], [(True, 1), (None, 0)])
@@ -1,9 +1,23 @@
 # python manage.py test api.tests.tests.test_views
 
+from django.contrib.auth.models import User
+from django.http import HttpResponse
 from django.test import TestCase
+from django.urls import reverse
+from mixer.backend.django import mixer
+from PIL import Image, features
 
+from io import BytesIO
+import base64
 import logging
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
 
+from socialDistribution import renditions
+from socialDistribution.executors import fetch_executor
 from socialDistribution.models import *
 from socialDistribution.builders import *
 
@@ -58,3 +72,170 @@ class SharePostTest(TestCase):
         self.assertEquals(latestPost, post)
         self.assertEqual(latestPost.origin, post.get_id())
         self.assertEqual(latestPost.source, post.get_id())
+
+
+class UnlistedPostImageTest(TestCase):
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        # store renditions in a fresh directory
+        self.default_location = renditions.RENDITION_CACHE_LOCATION
+        self.location = tempfile.mkdtemp()
+        renditions.RENDITION_CACHE_LOCATION = self.location
+
+        user = User.objects.create_user(username="image_test_user", password="password")
+        self.author = mixer.blend(LocalAuthor, user=user)
+        self.client.force_login(user)
+
+        png = BytesIO()
+        Image.new('RGB', (4, 4), color='red').save(png, 'png')
+        self.post = mixer.blend(
+            LocalPost,
+            author=self.author,
+            visibility=LocalPost.Visibility.PUBLIC,
+            unlisted=True,
+            content_type=LocalPost.ContentType.PNG,
+            content=base64.b64encode(png.getvalue())
+        )
+        self.url = reverse('socialDistribution:unlisted-post-image', args=[self.post.id])
+
+    def tearDown(self):
+        renditions.RENDITION_CACHE_LOCATION = self.default_location
+        shutil.rmtree(self.location, ignore_errors=True)
+
+    @unittest.skipUnless(features.check('webp'), "Pillow was built without webp support")
+    def test_webp_rendition(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='image/webp,image/*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).format, 'WEBP')
+        etag = response['ETag']
+
+        # the image is converted once, and not sent again to a browser that has it
+        response = self.client.get(self.url, HTTP_ACCEPT='image/webp', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(os.listdir(self.location)), 1)
+
+        # an edit changes the version of the image
+        self.post.title = "edited"
+        self.post.save()
+        response = self.client.get(self.url, HTTP_ACCEPT='image/webp', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response.close()
+
+    def test_rendition(self):
+        # the encoder is mocked, so the view is tested even if Pillow was built without webp support
+        with mock.patch('socialDistribution.renditions.convert', return_value=b'webp image') as convert:
+            response = self.client.get(self.url, HTTP_ACCEPT='image/webp')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'webp image')
+            self.assertEqual(response['Cache-Control'], f'private, max-age={renditions.RENDITION_MAX_AGE}')
+
+            # the second request is served from disk
+            response = self.client.get(self.url, HTTP_ACCEPT='image/webp')
+            self.assertEqual(b''.join(response.streaming_content), b'webp image')
+            response.close()
+
+        convert.assert_called_once()
+        self.assertEqual(len(os.listdir(self.location)), 1)
+
+    def test_open_rendition(self):
+        # png is always supported by Pillow
+        with renditions.open_rendition(self.post, 'png') as converted:
+            data = converted.read()
+        self.assertEqual(Image.open(BytesIO(data)).format, 'PNG')
+
+        with renditions.open_rendition(self.post, 'png') as stored:
+            self.assertEqual(stored.read(), data)
+
+    def test_evicted_rendition_is_converted_again(self):
+        with mock.patch('socialDistribution.renditions.convert', return_value=b'png image') as convert:
+            renditions.open_rendition(self.post, 'png').close()
+            renditions.evict(max_bytes=0)
+            self.assertEqual(os.listdir(self.location), [])
+
+            with renditions.open_rendition(self.post, 'png') as rendition:
+                self.assertEqual(rendition.read(), b'png image')
+
+        self.assertEqual(convert.call_count, 2)
+
+    def test_if_none_match(self):
+        etag = renditions.rendition_etag(self.post, 'webp')
+
+        for header in ['*', f'"other", W/{etag}']:
+            response = self.client.get(self.url, HTTP_ACCEPT='image/webp', HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+        # nothing was converted
+        self.assertEqual(os.listdir(self.location), [])
+
+    def test_eviction(self):
+        for i, name in enumerate(['old', 'recent']):
+            path = os.path.join(self.location, name)
+            with open(path, 'wb') as file:
+                file.write(b'x' * 10)
+            os.utime(path, (i, i))
+
+        # the least recently used renditions are removed first
+        renditions.evict(max_bytes=15)
+        self.assertEqual(os.listdir(self.location), ['recent'])
+
+    def test_unsupported_format(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='image/gif')
+        self.assertEqual(response.status_code, 415)
+
+
+class RemoteAuthorTest(TestCase):
+
+    # the pillow, https://stackoverflow.com/users/2812257/the-pillow, "How can I disable logging while running unit tests in Python Django?"
+    # https://stackoverflow.com/a/54519433, 2019-02-04, CC BY-SA 4.0
+
+    # disable logging before tests
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    # enable logging after tests
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def setUp(self):
+        user = User.objects.create_user(username="remote_author_test_user", password="password")
+        mixer.blend(LocalAuthor, user=user)
+        self.client.force_login(user)
+
+        self.author = Author.objects.create(url="http://example.com/author/1")
+
+    def test_posts_without_cached_author(self):
+        def make_post(author_url, cached_author, number):
+            return mixer.blend(InboxPost, author=author_url, cached_author=cached_author, public_id=f"{author_url}/posts/{number}",
+                               visibility=InboxPost.Visibility.PUBLIC, _author_json={})
+
+        linked = make_post(self.author.url, self.author, 1)
+        unlinked = make_post(self.author.url, None, 2)
+        make_post("http://example.com/author/2", None, 3)
+
+        # the home node of the author is not reachable, only the stored posts are shown
+        with mock.patch('socialDistribution.requests.get', return_value=(503, None)), \
+                mock.patch.object(fetch_executor, 'submit'), \
+                mock.patch('socialDistribution.views.render', return_value=HttpResponse()) as render:
+            self.client.get(reverse('socialDistribution:author', args=[self.author.id]))
+
+        context = render.call_args[0][2]
+        posts = list(context['author_posts'])
+        self.assertCountEqual(posts, [linked, unlinked])
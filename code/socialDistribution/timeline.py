@@ -0,0 +1,144 @@
+""" This file contains methods that maintain the materialized home feed (TimelineEntry) of every local author.
+
+    Entries are written when a post is created, edited or deleted (fan-out on write), so that reading
+    a home feed is a single index range scan. The signal handlers in signals.py call these methods.
+    The rebuild_timelines command rebuilds all timelines from scratch, e.g. after bulk changes that
+    bypass signals.
+"""
+
+from django.db import transaction
+
+import logging
+
+from socialDistribution.models import LocalAuthor, LocalPost, InboxPost, Follow, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+
+def local_post_owners(post):
+    """ Gets the ids of the local authors whose home feed shows a LocalPost (see PostQuerySet.feed_for). """
+
+    if post.unlisted:
+        return set()
+
+    if post.visibility == LocalPost.Visibility.PUBLIC:
+        return set(LocalAuthor.objects.values_list('id', flat=True))
+
+    owners = {post.author_id}
+    if post.visibility == LocalPost.Visibility.FRIENDS:
+        owners.update(
+            LocalAuthor.objects.filter(id__in=Follow.friend_ids(post.author)).values_list('id', flat=True)
+        )
+    return owners
+
+
+def fan_out_local_post(post):
+    """ Adds a created or edited LocalPost to the timelines that should show it, and removes it
+        from the timelines that should no longer show it (e.g. after a visibility change).
+    """
+
+    owners = local_post_owners(post)
+    with transaction.atomic():
+        entries = TimelineEntry.objects.filter(local_post=post)
+        entries.exclude(owner_id__in=owners).delete()
+
+        existing = set(entries.values_list('owner_id', flat=True))
+        entries.exclude(published=post.published).update(published=post.published)
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=owner, local_post=post, published=post.published) for owner in owners - existing],
+            ignore_conflicts=True
+        )
+
+
+def add_inbox_posts(owner_id, inbox_post_ids):
+    """ Adds InboxPosts received in the inbox of a local author to their timeline. """
+
+    posts = InboxPost.objects.listed().filter(id__in=inbox_post_ids).only('id', 'published')
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(owner_id=owner_id, inbox_post=post, published=post.published) for post in posts],
+        ignore_conflicts=True
+    )
+
+
+def remove_inbox_posts(owner_id, inbox_post_ids=None):
+    """ Removes InboxPosts from the timeline of a local author (all InboxPosts if inbox_post_ids is None). """
+
+    entries = TimelineEntry.objects.filter(owner_id=owner_id, inbox_post__isnull=False)
+    if inbox_post_ids is not None:
+        entries = entries.filter(inbox_post_id__in=inbox_post_ids)
+    entries.delete()
+
+
+def update_inbox_post(post):
+    """ Updates the timeline entries of an InboxPost after it was changed, e.g. by InboxPost.fetch_update. """
+
+    entries = TimelineEntry.objects.filter(inbox_post=post)
+    if post.unlisted:
+        entries.delete()
+    elif entries.exists():
+        entries.exclude(published=post.published).update(published=post.published)
+    else:
+        # the post was unlisted before, add it back to the timelines of the inboxes it is in
+        owners = LocalAuthor.objects.filter(inbox_posts=post).values_list('id', flat=True)
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=owner, inbox_post=post, published=post.published) for owner in owners],
+            ignore_conflicts=True
+        )
+
+
+def update_friend_posts(author_id, other_id):
+    """ Adds or removes the friends posts of two authors from each other's timeline after a follow
+        between them was created or deleted.
+    """
+
+    authors = {author.id: author for author in LocalAuthor.objects.filter(id__in=[author_id, other_id])}
+    if len(authors) != 2:
+        # friends posts are only shown to local authors
+        return
+
+    are_friends = Follow.objects.filter(actor_id=author_id, object_id=other_id).exists() and \
+        Follow.objects.filter(actor_id=other_id, object_id=author_id).exists()
+
+    with transaction.atomic():
+        for owner_id, poster_id in [(author_id, other_id), (other_id, author_id)]:
+            posts = LocalPost.objects.listed().filter(author_id=poster_id, visibility=LocalPost.Visibility.FRIENDS)
+            if are_friends:
+                TimelineEntry.objects.bulk_create(
+                    [TimelineEntry(owner_id=owner_id, local_post=post, published=post.published) for post in posts],
+                    ignore_conflicts=True
+                )
+            else:
+                TimelineEntry.objects.filter(owner_id=owner_id, local_post__in=posts).delete()
+
+
+def rebuild_timeline(author):
+    """ Rebuilds the timeline of a local author from scratch. """
+
+    local_posts = LocalPost.objects.feed_for(author).only('id', 'published')
+    inbox_posts = author.inbox_posts.listed().only('id', 'published')
+
+    entries = [TimelineEntry(owner_id=author.id, local_post=post, published=post.published) for post in local_posts]
+    entries += [TimelineEntry(owner_id=author.id, inbox_post=post, published=post.published) for post in inbox_posts]
+
+    with transaction.atomic():
+        TimelineEntry.objects.filter(owner_id=author.id).delete()
+        TimelineEntry.objects.bulk_create(entries, batch_size=500)
+
+    return len(entries)
+
+
+def get_timeline(author, limit=None):
+    """ Gets the posts in the home feed of a local author, newest first.
+
+        Parameters:
+         - author (LocalAuthor): The author whose feed is read
+         - limit (int): Maximum number of posts (default is None, no limit)
+
+        Returns:
+         - (list): LocalPosts and InboxPosts
+    """
+
+    entries = TimelineEntry.objects.filter(owner_id=author.id).select_related('local_post__author', 'inbox_post__cached_author')
+    if limit:
+        entries = entries[:limit]
+    return [entry.post for entry in entries]
@@ -1,10 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from django.db import connection
+
 import socialDistribution.requests as api_requests
-from .models import LocalPost
+from .models import LocalPost, PostLike
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# seconds that a page waits for all remote likes; likes that take longer are taken from the response
+# cache (possibly stale) or shown as unknown, and are cached once their requests complete
+LIKES_TIME_BUDGET = 3
+
+# the remote likes of all pages (posts and comments) are fetched on one shared pool, so that requests
+# abandoned after the time budget cannot pile up threads under load
+MAX_LIKE_WORKERS = 16
+_likes_executor = ThreadPoolExecutor(max_workers=MAX_LIKE_WORKERS, thread_name_prefix="likes")
+
+
+def run_in_worker(func, *args):
+    """
+    Runs func in a worker thread. The requests can query the database (e.g. for node
+    credentials), and worker threads must close their own database connection.
+    """
+
+    try:
+        return func(*args)
+    finally:
+        connection.close()
+
+
+def count_likes(likes_list, author):
+    """
+    Returns a boolean indicating whether the author parameter is the author
+    of one of the likes in likes_list, and the number of likes
+    """
+
+    is_liked = False
+    for like in likes_list:
+        if like['author']['id'] == author.get_url_id():
+            is_liked = True
+            break
+
+    return is_liked, len(likes_list)
+
+
+def get_cached_like_info(likes_url, author):
+    """
+    Returns the like info of the object whose likes are at likes_url from the response
+    cache, without making a request. Returns None and 0 if the likes are not cached
+    """
+
+    try:
+        response_body, is_fresh = api_requests.get_cached(likes_url)
+        if response_body is None:
+            return None, 0
+
+        # workaround for T16, see get_post_like_info
+        likes_list = response_body["items"] if isinstance(response_body, dict) else response_body
+        return count_likes(likes_list, author)
+
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        return None, 0
+
+
+def fetch_like_info(calls, time_budget):
+    """
+    Runs each (func, *args) of calls on the shared likes pool, waiting at most time_budget
+    seconds for all of them. Returns the results in order, None for calls that did not
+    finish in time.
+    """
+
+    futures = [_likes_executor.submit(run_in_worker, *call) for call in calls]
+    wait(futures, timeout=time_budget)
+
+    # do not wait for slow nodes: requests that were sent finish in the background and fill the
+    # response cache, and requests that were not sent yet are dropped
+    for future in futures:
+        future.cancel()
+
+    return [future.result() if future.done() and not future.cancelled() else None for future in futures]
+
 
 def get_post_like_info(post, author):
     """
@@ -23,7 +100,8 @@ def get_post_like_info(post, author):
 
         else:
             request_url = post.public_id.strip('/') + '/likes'
-            status_code, response_body = api_requests.get(request_url)
+            with api_requests.host_limit(request_url):
+                status_code, response_body = api_requests.get(request_url, cached=True)
 
             if status_code == 200 and response_body is not None:
                 try:
@@ -33,14 +111,7 @@ def get_post_like_info(post, author):
                 except KeyError:
                     likes_list = response_body
 
-                is_liked = False
-                for like in likes_list:
-                    if like['author']['id'] == author.get_url_id():
-                        is_liked = True
-                        break
-                    
-
-                return is_liked, len(likes_list)
+                return count_likes(likes_list, author)
 
             else:
                 return None, 0
@@ -48,6 +119,38 @@ def get_post_like_info(post, author):
         logger.error(e, exc_info=True)
         return None, 0
 
+def prefetch_like_info(posts, author, time_budget=LIKES_TIME_BUDGET):
+    """
+    Loads the like info of every post on a page before the page is rendered, so that the
+    post_card tag does not query or make remote requests per card. The likes of local posts
+    are loaded with one query and the likes of inbox posts are fetched concurrently, waiting
+    at most time_budget seconds for all of them.
+
+    The result of get_post_like_info is stored on each post as _like_info. Inbox posts whose
+    likes did not arrive in time get the cached like info, or (None, 0).
+    Returns the posts as a list.
+    """
+
+    posts = list(posts)
+    local_posts = [post for post in posts if type(post) is LocalPost]
+    remote_posts = [post for post in posts if type(post) is not LocalPost]
+
+    if local_posts:
+        liked = set(
+            PostLike.objects.filter(author=author, object__in=local_posts).values_list('object_id', flat=True)
+        )
+        for post in local_posts:
+            post._like_info = (post.id in liked, post.total_likes())
+
+    if remote_posts:
+        results = fetch_like_info([(get_post_like_info, post, author) for post in remote_posts], time_budget)
+        for post, like_info in zip(remote_posts, results):
+            if like_info is None:
+                like_info = get_cached_like_info(post.public_id.strip('/') + '/likes', author)
+            post._like_info = like_info
+
+    return posts
+
 def get_comment_like_info(comment, author):
     """
     Returns a boolean indicating whether the author parameter
@@ -57,21 +160,13 @@ def get_comment_like_info(comment, author):
     If an error occurs, it returns None and 0
     """
     try:
-        print(__name__)
         comment_id = comment["id"]
         request_url = comment_id.strip('/') + '/likes'
-        status_code, response_body = api_requests.get(request_url)
+        with api_requests.host_limit(request_url):
+            status_code, response_body = api_requests.get(request_url, cached=True)
 
         if status_code == 200 and response_body is not None:
-            likes_list = response_body["items"]
-
-            is_liked = False
-            for like in likes_list:
-                if like['author']['id'] == author.get_url_id():
-                    is_liked = True
-                    break
-
-            return is_liked, len(likes_list)
+            return count_likes(response_body["items"], author)
 
         else:
             return None, 0
@@ -80,6 +175,23 @@ def get_comment_like_info(comment, author):
         return None, 0
 
 
+def prefetch_comment_like_info(comments, author, time_budget=LIKES_TIME_BUDGET):
+    """
+    Fetches the like info of the comments on a page concurrently, waiting at most time_budget
+    seconds for all of them. The result of get_comment_like_info is stored in each comment
+    as "like_info"; comments whose likes did not arrive in time get the cached like info,
+    or (None, 0).
+    """
+
+    if not comments:
+        return
+
+    results = fetch_like_info([(get_comment_like_info, comment, author) for comment in comments], time_budget)
+    for comment, like_info in zip(comments, results):
+        if like_info is None:
+            like_info = get_cached_like_info(str(comment.get("id", "")).strip('/') + '/likes', author)
+        comment["like_info"] = like_info
+
 
 def get_like_text(is_liked, likes_count):
     """
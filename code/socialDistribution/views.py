@@ -6,12 +6,15 @@ from django.http import HttpResponse, HttpResponseNotFound
 from django.contrib.auth.models import Group
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.utils import timezone
+from django.utils.http import parse_etags
 from django.core.exceptions import ValidationError
 from django.shortcuts import redirect
+from django.db import transaction
 from django.db.models import Count, Q
 
 from cmput404.constants import SCHEME, HOST, API_BASE, LOCAL, REMOTE, REMOTE_NODES
 from socialDistribution.fetchers import fetch_remote_authors, fetch_author_update, fetch_follow_update
+from socialDistribution.fetchers import fetch_post_author_updates, fetch_post_updates
 from .forms import CreateUserForm, PostForm
 from api.parsers import url_parser
 
@@ -26,15 +29,17 @@ from api.utility import makeInboxPost
 from .models import *
 from .forms import CreateUserForm, PostForm
 from .decorators import unauthenticated_user
-from PIL import Image
-from io import BytesIO
 import logging
 from datetime import datetime
 import timeago
 
 
-from .dispatchers import dispatch_post, dispatch_follow_request
+from .dispatchers import dispatch_post, dispatch_follow_request, dispatch_activity
 from .github_activity.github_activity import pull_github_events
+from .timeline import get_timeline
+from .utility import prefetch_like_info, prefetch_comment_like_info
+from .renditions import open_rendition, rendition_etag, RENDITION_MAX_AGE
+from .author_sync import cache_authors
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +49,9 @@ REQUIRE_SIGNUP_APPROVAL = True
     if time permits store this in database and allow change from admin dashboard.
 '''
 
+# maximum number of posts shown in the home feed
+HOME_FEED_SIZE = 100
+
 
 def index(request):
     """
@@ -166,14 +174,14 @@ def unlisted_post_image(request, post_id):
     """
 
     if request.method == 'GET':
-        post = get_object_or_404(LocalPost, pk=int(post_id))
+        post = get_object_or_404(LocalPost, pk=post_id)
         user_author = get_object_or_404(LocalAuthor, user=request.user)
 
         # post must be visible
-        if not post.is_public() or post.author.id != user_author.id:
+        if not post.is_public() and post.author.id != user_author.id:
             return HttpResponseForbidden()
 
-        accepted_types = request.headers['Accept']
+        accepted_types = request.headers.get('Accept', '')
 
         if 'image' in accepted_types:
             if post.is_image_post() and post.unlisted:
@@ -182,26 +190,31 @@ def unlisted_post_image(request, post_id):
                     format = mime_type.split('/')[-1]
                     format = format.split(';')[0]
 
-                    # Save post image as webp into a byte stream (BytesIO)
+                    # Serve post image as webp, converted once per version of the image (see renditions.py)
                     # The markdown parser uses webp to display embedded images
-                    if format.lower() == 'webp':
-                        image_binary = base64.b64decode(post.decoded_content)
-                        img = Image.open(BytesIO(image_binary))
-                        webp_bytes_arr = BytesIO()
-                        img.save(webp_bytes_arr, 'webp')
-                        webp_img = webp_bytes_arr.getvalue()
-
-                        response = HttpResponse()
-                        response.write(webp_img)
-                        response['Content-Type'] = 'image/webp'
+                    if format.strip().lower() == 'webp':
+                        etag = rendition_etag(post, 'webp')
+
+                        # the browser already has this version of the image (ETags are compared weakly)
+                        # Django Software Foundation, "django.utils.http", https://docs.djangoproject.com/en/3.2/ref/utils/#module-django.utils.http
+                        cached_etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+                        if '*' in cached_etags or etag in cached_etags:
+                            response = HttpResponseNotModified()
+                        else:
+                            response = FileResponse(open_rendition(post, 'webp'), content_type='image/webp')
+
+                        # the image is only visible to some users, and is revalidated with the ETag once it is
+                        # RENDITION_MAX_AGE seconds old (an edit changes the ETag)
+                        response['ETag'] = etag
+                        response['Cache-Control'] = f'private, max-age={RENDITION_MAX_AGE}'
                         return response
 
-                return HttpResponse(status_code=415)    # unsupported media type
+                return HttpResponse(status=415)    # unsupported media type
 
             else:
                 return HttpResponseNotFound('Post image not found')
         else:
-            return HttpResponse(status_code=415)    # unsupported media type
+            return HttpResponse(status=415)    # unsupported media type
 
     return HttpResponseBadRequest()
 
@@ -215,23 +228,9 @@ def home(request):
 
     author = get_object_or_404(LocalAuthor, user=request.user)
 
-    # get all local public posts
-    posts = LocalPost.objects.listed().get_public()
-
-    # get all posts created by author
-    my_posts = author.posts.listed()
-    posts = posts.union(my_posts)
-
-    # get all friend posts from authors friends
-    for other in author.get_followers():
-        if author.has_friend(other):
-            # can only get local posts if local author
-            try:
-                local_other = LocalAuthor.objects.get(id=other.id)
-                friend_posts = local_other.posts.listed().get_friend()
-                posts = posts.union(friend_posts)
-            except LocalAuthor.DoesNotExist:
-                pass
+    # get public posts, posts by author, friends posts of friends and posts received in the inbox
+    posts = get_timeline(author, limit=HOME_FEED_SIZE)
+    posts = prefetch_like_info(posts, author)
 
     github_events = None
     if author.githubUrl:
@@ -245,7 +244,7 @@ def home(request):
         'author': author,
         'github_events': github_events,
         'modal_type': 'post',
-        'latest_posts': posts.chronological(),
+        'latest_posts': posts,
         'error': False,
         'error_msg': ""
     }
@@ -295,7 +294,7 @@ def befriend(request, author_id):
             # send follow request
             is_success = dispatch_follow_request(actor, object)
             if is_success:
-                messages.success(request, "Follow request sent successfully")
+                messages.success(request, "Follow request sent")
             else:
                 messages.error(request, "Failed to send follow request")
 
@@ -339,10 +338,11 @@ def authors(request):
     fetch_remote_authors()
 
     author_objects = Author.objects.all()
+    local_ids = set(LocalAuthor.objects.values_list('id', flat=True))
 
     authors = []
     for author in author_objects:
-        if LocalAuthor.objects.filter(id=author.id).exists():
+        if author.id in local_ids:
             authors.append({
                 "data": author,
                 "type": LOCAL
@@ -393,19 +393,20 @@ def author(request, author_id):
                 if post:
                     makeInboxPost(post)
 
+        # posts received before the author was cached are only linked by URL
         posts = InboxPost.objects.filter(
-            author=author.get_url_id(),
+            Q(cached_author=author) | Q(cached_author__isnull=True, author=author.get_url_id()),
             visibility=InboxPost.Visibility.PUBLIC
-        )
+        ).select_related('cached_author')
 
-        for p in posts:
-            p.fetch_update()
+        # edits and deletes are checked in the background
+        fetch_post_updates(posts)
 
     context = {
         'author': author,
         'author_type': author_type,
         'curr_user': curr_user,
-        'author_posts': posts.chronological()
+        'author_posts': prefetch_like_info(posts.chronological(), curr_user)
     }
 
     return render(request, 'author/detail.html', context)
@@ -423,7 +424,7 @@ def unlisted_posts(request):
         'modal_type': 'copy',
         'author_type': 'Local',
         'curr_user': curr_user,
-        'author_posts': posts.chronological()
+        'author_posts': prefetch_like_info(posts.chronological(), curr_user)
     }
 
     return render(request, 'author/detail.html', context)
@@ -465,19 +466,7 @@ def posts(request, author_id):
 
                 categories = form.cleaned_data.get('categories')
                 if categories is not None:
-                    categories = categories.split()
-
-                    """
-                    This implementation makes category names case-insensitive.
-                    This makes handling Category objects cleaner, albeit slightly more
-                    involved.
-                    """
-                    for category in categories:
-                        category_obj, created = Category.objects.get_or_create(
-                            category__iexact=category,
-                            defaults={'category': category}
-                        )
-                        new_post.categories.add(category_obj)
+                    new_post.set_categories(categories.split())
 
                 # get recipients for a private post
                 if form.cleaned_data.get('visibility') == LocalPost.Visibility.PRIVATE:
@@ -541,22 +530,7 @@ def share_post(request, id):
 
             new_post.save()
             
-            categories = oldPost.categories.all()
-            categories = [cat.category for cat in categories]
-            
-
-            if categories is not None:
-                """
-                This implementation makes category names case-insensitive.
-                This makes handling Category objects cleaner, albeit slightly more
-                involved.
-                """
-                for category in categories:
-                    category_obj, created = Category.objects.get_or_create(
-                        category__iexact=category,
-                        defaults={'category': category}
-                    )
-                    new_post.categories.add(category_obj)
+            new_post.categories.set(oldPost.categories.all())
             to_dispatch = new_post
 
 
@@ -617,27 +591,7 @@ def edit_post(request, id):
 
                 categories = form.cleaned_data.get('categories')
                 if categories is not None:
-                    categories = categories.split()
-                    categories_to_remove = [cat.category for cat in post.categories.all()]
-
-                    """
-                    This implementation makes category names case-insensitive.
-                    This makes handling Category objects cleaner, albeit slightly more
-                    involved.
-                    """
-                    for category in categories:
-                        category_obj, created = Category.objects.get_or_create(
-                            category__iexact=category,
-                            defaults={'category': category}
-                        )
-                        post.categories.add(category_obj)
-
-                        while category_obj.category in categories_to_remove:
-                            categories_to_remove.remove(category_obj.category)     # don't remove this category
-
-                    for category in categories_to_remove:
-                        category_obj = Category.objects.get(category=category)
-                        post.categories.remove(category_obj)
+                    post.set_categories(categories.split())
 
                 post.save()
 
@@ -689,11 +643,9 @@ def like_post(request, post_type, id):
             "object": obj
         }
 
-        # redirect request to remote/local api
-        status_code, response_data = api_requests.post(url=request_url, data=like)
-
-        if status_code >= 400:
-            messages.error(request, 'An error occurred while liking post')
+        # send like to remote/local api
+        # the cached likes of the post are invalidated once the like is delivered
+        dispatch_activity(request_url, like)
 
     prev_page = request.META['HTTP_REFERER']
 
@@ -722,7 +674,7 @@ def single_post(request, post_type, id):
     elif post_type == "inbox":
         post = get_object_or_404(InboxPost, id=id)
         author_is_user = post.author == current_user.get_url_id()
-        post_author = get_object_or_404(Author, url=post.author)
+        post_author = post.cached_author or get_object_or_404(Author, url=post.author)
     else:
         raise Http404()
 
@@ -730,46 +682,42 @@ def single_post(request, post_type, id):
         comments_json = post.comments_as_json
         comments_to_hide = []
 
+        # redirect user if server unresponsive
+        if any(not comment["author"] for comment in comments_json):
+            messages.info(request, "Remote Server Unresponsive. Failed to get comments. Please try again later.")
+            return redirect('socialDistribution:home')
+
+        # add or update the commenters, and check their relationships with the current user, in a few queries
+        commenters = cache_authors([comment["author"] for comment in comments_json])
+        local_ids = set(
+            LocalAuthor.objects.filter(id__in=[author.id for author in commenters.values()]).values_list('id', flat=True)
+        )
+        friend_graph = current_user.get_friend_graph()
+
         for comment in comments_json:
             # hack
             # inject more data into json comment
             # retrieve it in comment.py
 
-            # redirect user if server unresponsive
-            if (not comment["author"]):
-                messages.info(request, "Remote Server Unresponsive. Failed to get comments. Please try again later.")
-                return redirect('socialDistribution:home')
-
-            comment_author, created = Author.objects.get_or_create(
-                url=comment["author"]["id"]
-            )
-            # add or update remaining fields
-            comment_author.update_with_json(data=comment["author"])
-
-            # get database record of comment_author
-            try:
-                author = LocalAuthor.objects.get(url=comment_author.url)
-                author_type = LOCAL
-
-            except LocalAuthor.DoesNotExist:
-                author = get_object_or_404(Author, url=comment_author.url)
-                author_type = REMOTE
+            comment_author = commenters[comment["author"]["id"]]
+            author_type = LOCAL if comment_author.id in local_ids else REMOTE
 
             # Hide comments from other friends of post_author
             if post.visibility == LocalPost.Visibility.FRIENDS and not author_is_user:
 
                 # if not a friend return
-                if not current_user.has_friend(post_author):
+                if not friend_graph.has_friend(post_author.id):
                     return HttpResponseForbidden("You don't permsission to see this friends only post.")
 
                 # check if comment from post_author or current user
-                if author.id != post_author.id and author.id != current_user.id:
+                if comment_author.id != post_author.id and comment_author.id != current_user.id:
                     comments_to_hide.append(comment)
                     continue
 
-            comment["comment_author_local_server_id"] = author.id
+            comment["comment_author_local_server_id"] = comment_author.id
             comment["comment_author_object"] = comment_author
             comment["author_type"] = author_type
+            comment["is_friend"] = friend_graph.has_friend(comment_author.id)
 
             # add comment time
             comment["when"] = ""
@@ -783,6 +731,9 @@ def single_post(request, post_type, id):
             # del comments_json[index]
             comments_json.remove(comment)
 
+        # likes of all comments are requested at the same time, within a time budget for the page
+        prefetch_comment_like_info(comments_json, current_user)
+
     except Exception as e:
         logger.error(e, exc_info=True)
         return HttpResponseServerError()
@@ -826,9 +777,10 @@ def like_comment(request):
             "object": comment_id
         }
 
-        # redirect request to remote/local api
+        # send like to remote/local api
         request_url = post_author.get_inbox()
-        api_requests.post(url=request_url, data=like)
+        # the cached likes of the comment are invalidated once the like is delivered
+        dispatch_activity(request_url, like)
 
     if prev_page is None:
         return redirect('socialDistribution:home')
@@ -858,14 +810,15 @@ def post_comment(request, author_id, post_id):
             if post_type == "local":
                 post = get_object_or_404(LocalPost, id=post_id)
 
-                # create local comment
-                Comment.objects.create(
-                    author=author,
-                    post=post,
-                    comment=comment,
-                    content_type='PL',  # TODO: add content type
-                    pub_date=pub_date,
-                )
+                # create local comment (and count it, see signals.py)
+                with transaction.atomic():
+                    Comment.objects.create(
+                        author=author,
+                        post=post,
+                        comment=comment,
+                        content_type='PL',  # TODO: add content type
+                        pub_date=pub_date,
+                    )
             elif post_type == "inbox":
                 post = get_object_or_404(InboxPost, id=post_id)
 
@@ -905,7 +858,7 @@ def post_comment(request, author_id, post_id):
                         data["id"] = f"{post.public_id.strip('/')}/comments/{uuid.uuid4()}" 
 
                 # send comment to remote inbox
-                api_requests.post(url=request_url, data=data)
+                dispatch_activity(request_url, data)
 
             else:
                 HttpResponseNotFound()
@@ -993,9 +946,12 @@ def inbox(request):
     author = LocalAuthor.objects.get(user=request.user)
     follow_requests = author.follow_requests.all()
 
-    for post in author.inbox_posts.all():
-        post.fetch_update()
-    posts = author.inbox_posts.all().order_by('-published')
+    posts = author.inbox_posts.select_related('cached_author').order_by('-published')
+    posts = prefetch_like_info(posts, author)
+    fetch_post_author_updates(posts)
+
+    # edits and deletes are checked in the background
+    fetch_post_updates(posts)
 
     context = {
         'author': author,